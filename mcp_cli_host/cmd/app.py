@@ -1,26 +1,26 @@
-from mcp_cli_host.llm.gemini.provider import Gemini
 from mcp_cli_host.llm.models import GenericMsg
-from mcp_cli_host.llm.azure.provider import Azure
-from mcp_cli_host.llm.openai.provider import Openai
-from mcp_cli_host.llm.deepseek.provider import Deepseek
-from mcp_cli_host.llm.ollama.provider import Ollama
-from mcp_cli_host.llm.base_provider import Provider
-from mcp_cli_host.llm.models import Role, CallToolResultWithID
-from mcp_cli_host.cmd.mcp import load_mcp_config, Server
-from mcp_cli_host.console import console
-from mcp_cli_host.cmd.utils import CLEAR_RIGHT, PREV_LINE, MARKDOWN, prune_messages, format_server_card, generated_tools_from_resource_templates, COMMON_SEPERATOR
-from mcp import types, StdioServerParameters, shared
+from mcp_cli_host.llm.base_provider import Provider, ContextLengthExceededError
+from mcp_cli_host.llm.tokens import TokenCounter
+from mcp_cli_host.llm.models import Role, CallToolResultWithID, ToolCall
+from mcp_cli_host.cmd.catalog import ServerCatalog, ToolRegistry
+from mcp_cli_host.cmd.compaction import summarize
+from mcp_cli_host.cmd.batch import run_batch
+from mcp_cli_host.cmd.serve import run_serve
+from mcp_cli_host.cmd.host import McpHost
+from mcp_cli_host.cmd.spill import SpillStore
+from mcp_cli_host.console import console, LiveMarkdown, ainput
+from mcp_cli_host.cmd.utils import CLEAR_RIGHT, PREV_LINE, MARKDOWN, prune_messages, prune_messages_by_tokens, group_turns, COMMON_SEPERATOR
+from mcp import types
 import json
 import logging
 import asyncio
 import argparse
 from rich.logging import RichHandler
 from rich.highlighter import NullHighlighter
-import os
 from rich.markdown import Markdown
 import traceback
-from collections import defaultdict
-from typing import Tuple, Union, List, Literal
+from contextlib import nullcontext
+from typing import Callable, Tuple, Union, List, Literal
 from textual_image.renderable import Image
 import base64
 from io import BytesIO
@@ -28,40 +28,42 @@ import readline  # noqa: F401
 
 log = logging.getLogger("mcp_cli_host")
 
+# How often a request rejected for its context length is retried with a shorter history
+CONTEXT_RETRIES = 3
+# Latest turns which are never summarized by the compaction
+COMPACT_KEEP_TURNS = 2
+
 
 class ChatSession:
+    """One conversation on a `McpHost`: its history, the tools it offers and the compaction of its history."""
+
     def __init__(self,
-                 model: str,
-                 server_conf_path: str = None,
-                 openai_url: str = None,
+                 host: McpHost,
                  message_window: int = 10,
-                 debug_model: bool = False,
-                 roots: list[str] = None,
-                 sys_prompt: str = None
+                 sys_prompt: str = None,
+                 stream: bool = False,
+                 context_tokens: int = None,
+                 compact_threshold: int = None,
+                 compact_model: str = None
                  ) -> None:
-        self.model = model
-        self.server_conf_path = server_conf_path
-        self.openai_url = openai_url
+        self.host = host
         self.message_window = message_window
-        self.debug_model = debug_model
-        self.servers: dict[str, Server] = None
+        self.context_tokens = context_tokens
+        self._token_counter: TokenCounter | None = None
+        self.compact_threshold = compact_threshold
+        self.compact_model = compact_model
+        self._compaction_task: asyncio.Task | None = None
         self.history_message: list[GenericMsg] = []
-        self.roots = roots
         self.sys_prompt = sys_prompt
-        self.tools: list[types.Tool] = []
-        self.resource_tools: list[types.Tool] = []
-        self.excluded_tools: list[str] = []
-        self.initialize_results: dict[str, types.InitializeResult] = {}
-        self.resources = defaultdict(list)
-        self.prompts: list[types.Prompt] = []
+        self.stream = stream
+        # Tools excluded by this conversation aren't excluded for the others
+        self.tool_registry: ToolRegistry = ToolRegistry(host.catalog, host.tool_filter)
+        # Spilled results are only readable by the conversation they were spilled from
+        self.spill_store: SpillStore = SpillStore(host.spill_threshold)
         # Put system prompt on the top of the history if exists
         if self.sys_prompt:
-            sys_prompt_message = {
-                "role": Role.SYSTEM.value,
-                "content": self.sys_prompt
-            }
             self.history_message.append(
-                GenericMsg(message_content=json.dumps(sys_prompt_message))
+                GenericMsg(role=Role.SYSTEM.value, content=self.sys_prompt)
             )
 
     async def handle_slash_command(self, prompt: str) -> Union[
@@ -73,15 +75,18 @@ class ChatSession:
             return (False, None)
         
         if prompt.lower().strip() == "/tools":
-            for name, server in self.servers.items():
+            for name, server in self.host.servers.items():
+                if self.server_unavailable(name):
+                    continue
                 console.print(f"[magenta]💻 {name}[/magenta]")
-                if not self.initialize_results.get(name).capabilities.tools and len(self.resource_tools) == 0:
+                server_catalog = self.host.catalog.servers.get(name, ServerCatalog())
+                if not self.host.initialize_results.get(name).capabilities.tools and len(server_catalog.resource_tools) == 0:
                     console.print(f"  [red] 🚫 Server {name} does not support tools.[/red]\n")
                     continue
                 
-                if self.initialize_results.get(name).capabilities.tools:
-                    for tool in await server.list_tools():
-                        excluded = tool.name in self.excluded_tools
+                if self.host.initialize_results.get(name).capabilities.tools:
+                    for tool in server_catalog.tools:
+                        excluded = not self.tool_registry.offers(tool.name)
                         tool_name = tool.name.split(COMMON_SEPERATOR)[1]
                         if excluded:
                             console.print(f"  [bright_red] 🚫 {tool_name} (excluded)[/bright_red]")
@@ -89,11 +94,9 @@ class ChatSession:
                             console.print(f"  [bright_cyan] 🔧 {tool_name}[/bright_cyan]")
                         console.print(f"    [bright_blue] {tool.description}[/bright_blue]")
                 
-                if len(self.resource_tools) > 0:
-                    resource_tools = [
-                        tool for tool in self.resource_tools if tool.name.startswith(name + COMMON_SEPERATOR)]
-                    for tool in resource_tools:
-                        excluded = tool.name in self.excluded_tools
+                if len(server_catalog.resource_tools) > 0:
+                    for tool in server_catalog.resource_tools:
+                        excluded = not self.tool_registry.offers(tool.name)
                         tool_name = tool.name.split(COMMON_SEPERATOR)[1]
                         if excluded:
                             console.print(f"  [bright_red] 🚫 {tool_name} (excluded)[/bright_red]")
@@ -113,31 +116,87 @@ class ChatSession:
             return (True, None)
         
         if prompt.lower().strip() == "/servers":
-            for name, server in self.servers.items():
+            for name, server in self.host.servers.items():
                 console.print(f"\n\n[magenta]💻 {name}[/magenta]\n")
                 console.print(f"[while]Command[while] [green]{server.config.command}\n")
-                console.print(f"[while]Arguments[while] [green]{server.config.args}\n\n")
+                console.print(f"[while]Arguments[while] [green]{server.config.args}\n")
+                console.print(f"[while]Status[while] [green]{server.status}" + (f" (initialized in {server.init_time:.2f}s)" if server.init_time is not None else "") + (f", reconnected {server.reconnects} times" if server.reconnects else "") + "\n")
+                if server.replicas:
+                    processes = [server, *server.replicas]
+                    connected = sum(1 for process in processes if process.session)
+                    calls = ", ".join(f"{process.name} {process.tool_calls}" for process in processes)
+                    console.print(f"[while]Replicas[while] [green]{connected}/{len(processes)} connected, {server.options.dispatch} dispatch, calls in flight: {calls}")
+                if server.resource_cache.enabled:
+                    resource_cache = server.resource_cache
+                    console.print(f"[while]Resource cache[while] [green]{len(resource_cache)} entries, {resource_cache.hits} hits, {resource_cache.misses} misses")
+                if server.transport_stats:
+                    for stream in ("stdout", "stdin", "stderr"):
+                        console.print(f"[while]Stream {stream}[while] [green]{getattr(server.transport_stats, stream)}")
+                console.print("\n")
             return (True, None)
         
+        if prompt.lower().startswith("/cache"):
+            args = prompt.split()
+            if len(args) > 1 and args[1].lower() == "clear":
+                dropped = self.host.result_cache.invalidate(args[2] if len(args) > 2 else None)
+                console.print(f"[green]{dropped} cached results dropped.[/green]\n")
+                return (True, None)
+
+            if not self.host.result_cache.enabled:
+                console.print("[red] 🚫 Tool result cache is disabled, enable it with --tool-cache or the toolCache section of the config.[/red]\n")
+                return (True, None)
+
+            options = self.host.result_cache.options
+            console.print(f"[magenta] 🗃️ Tool result cache[/magenta] [bright_blue]{len(self.host.result_cache)}/{options.max_entries} entries, TTL {options.ttl:g}s[/bright_blue]")
+            for tool_name, stats in sorted(self.host.result_cache.stats.items()):
+                console.print(f"  [bright_cyan] 🔧 {tool_name}[/bright_cyan] [bright_blue]{stats.hits} hits, {stats.misses} misses, hit rate {stats.hit_rate:.0%}[/bright_blue]")
+            console.print("\n")
+            return (True, None)
+
+        if prompt.lower().startswith("/stderr"):
+            args = prompt.split()
+            if len(args) < 2:
+                console.print("[red][bold]ERROR[/bold]: Missing server name[/red]\n")
+                return (True, None)
+
+            server = self.host.servers.get(args[1])
+            if server is None:
+                # Replicas are named `server#2`, `server#3`...
+                server = next((replica for pool in self.host.servers.values() for replica in pool.replicas if replica.name == args[1]), None)
+            if server is None:
+                console.print(f"[red][bold]ERROR[/bold]: Server '{args[1]}' not found[/red]\n")
+                return (True, None)
+
+            n = int(args[2]) if len(args) > 2 and args[2].isdigit() else 50
+            lines = server.stderr.tail(n)
+            console.print(f"[magenta]💻 {server.name}[/magenta] [bright_blue]last {len(lines)} of {server.stderr.total} stderr lines[/bright_blue]")
+            for line in lines:
+                console.print(line, markup=False, highlight=False)
+            console.print("\n")
+            return (True, None)
+
         if prompt.lower().startswith("/exclude_tool"):
             if len(prompt.split()) < 2:
                 console.print("[red][bold]ERROR[/bold]: Missing tool name to exclude[/red]\n")
                 return (True, None)
             
             tool_name = prompt.split()[1]
-            self.excluded_tools.extend([tool.name for tool in self.tools if tool.name.endswith(tool_name)])
-            self.tools = [tool for tool in self.tools if not tool.name.endswith(tool_name)]
+            if not self.tool_registry.exclude(tool_name):
+                console.print(f"[red][bold]ERROR[/bold]: Tool '{tool_name}' not found[/red]\n")
+                return (True, None)
             console.print(f"[green]Tool '{tool_name}' excluded successfully.[/green]\n")
             return (True, None)
 
         if prompt.lower().startswith("/resources"):
-            for name, server in self.servers.items():
+            for name, server in self.host.servers.items():
+                if self.server_unavailable(name):
+                    continue
                 console.print(f"[magenta] 📚 {name}[/magenta]")
-                if not self.initialize_results.get(name).capabilities.resources:
+                if not self.host.initialize_results.get(name).capabilities.resources:
                     console.print(f"  [red] 🚫 Server {name} does not support resources.[/red]\n")
                     continue
                 
-                for resource in await server.list_resources():
+                for resource in self.host.catalog.servers.get(name, ServerCatalog()).resources:
 
                     resource_name = resource.name.split(COMMON_SEPERATOR)[1]
                     console.print(f"  [bright_cyan] 📖 {resource_name}[/bright_cyan]")
@@ -157,7 +216,7 @@ class ChatSession:
             if COMMON_SEPERATOR in uri:
                 server_input, uri = uri.split(COMMON_SEPERATOR)  # Handle server--uri format
 
-            server_name = self.resources[uri]
+            server_name = self.host.catalog.resources.get(uri, [])
             if len(server_name) == 0:
                 console.print(f"[red][bold]ERROR[/bold]: Resource {uri} not found in any server.[/red]\n")
                 return (True, None)
@@ -172,7 +231,7 @@ class ChatSession:
                 return (True, None)
 
             server_name = server_input if server_input else server_name[0]
-            server = self.servers.get(server_name, None)
+            server = self.host.servers.get(server_name, None)
             if not server:
                 console.print(f"[red][bold]ERROR[/bold]: Server {server_name} not found.[/red]\n")
                 return (True, None)
@@ -193,17 +252,19 @@ class ChatSession:
             raise KeyboardInterrupt()
         
         if prompt.lower().strip() == "/prompts":
-            for name, server in self.servers.items():
+            for name, server in self.host.servers.items():
+                if self.server_unavailable(name):
+                    continue
                 console.print(f"[magenta] 📑 {name}[/magenta]")
-                if not self.initialize_results.get(name).capabilities.prompts:
+                if not self.host.initialize_results.get(name).capabilities.prompts:
                     console.print(f"  [red] 🚫 Server {name} does not support prompts.[/red]\n")
                     continue
                 
-                for prot in await server.list_prompts():
+                for prot in self.host.catalog.servers.get(name, ServerCatalog()).prompts:
                     prompt_name = prot.name.split(COMMON_SEPERATOR)[1]
                     console.print(f"  [bright_cyan] 📄 {prompt_name}[/bright_cyan]")
                     console.print(f"    [bright_blue] {prot.description}[/bright_blue]")
-                    for argument in prot.arguments:
+                    for argument in prot.arguments or []:
                         console.print(f"      [bright_yellow][bright_cyan]{argument.name}[/bright_cyan]: {'(Required)' if argument.required else '(optional)'}[/bright_yellow]")
                         console.print(f"      [bright_blue]{argument.description}[/bright_blue]")
 
@@ -221,7 +282,7 @@ class ChatSession:
                 server_input, name = name.split(COMMON_SEPERATOR)  # Handle server--name format
 
             candidate_prompts = [
-               prot for prot in self.prompts if prot.name.endswith(name)]
+               prot for prot in self.host.catalog.prompts if prot.name.endswith(name)]
             
             if len(candidate_prompts) == 0:
                 console.print(f"[red][bold]ERROR[/bold]: Prompt {name} not found in any server.[/red]\n")
@@ -237,7 +298,7 @@ class ChatSession:
                 return (True, None)
 
             server_name = server_input if server_input else candidate_prompts[0].name.split(COMMON_SEPERATOR)[0]
-            server = self.servers.get(server_name, None)
+            server = self.host.servers.get(server_name, None)
             if not server:
                 console.print(f"[red][bold]ERROR[/bold]: Server {server_name} not found.[/red]\n")
                 return (True, None)
@@ -319,35 +380,56 @@ class ChatSession:
     async def run_promt(self,
                         provider: Provider,
                         prompt: str,
-                        messages: list[any] = None) -> None:
+                        messages: list[any] = None,
+                        on_delta: Callable[[str], None] | None = None) -> None:
+        """Answer a prompt, calling tools until the LLM responds with text.
 
-        if prompt != "":
-            message = {
-                "role": Role.USER.value,
-                "content": prompt
-            }
+        Without a terminal `on_delta` receives the streamed text instead, e.g. to forward it to an API client.
+        """
 
+        if prompt != "":
             # Push promot from user
             self.history_message.append(
-                GenericMsg(message_content=json.dumps(message))
+                GenericMsg(role=Role.USER.value, content=prompt)
             )
 
         if messages:
             # If messages are provided, add them to the history
             self.history_message.extend([
-                GenericMsg(message_content=json.dumps(msg)) for msg in messages
+                GenericMsg(role=msg["role"], content=msg["content"]) for msg in messages
             ])
 
         if not self.history_message[-1].is_tool_res_image() and not self.history_message[-1].is_tool_res_audio():
-            with console.status("[bold bright_magenta]Thinking...[/bold bright_magenta]"):
+            live_view: LiveMarkdown | None = None
+            with console.status("[bold bright_magenta]Thinking...[/bold bright_magenta]") if self.host.interactive else nullcontext() as status:
+                if self.stream and self.host.interactive:
+                    live_view = LiveMarkdown(status)
+                tools = self.tools
                 try:
-                    llm_res: GenericMsg = provider.completions_create(
-                        prompt=prompt,
-                        messages=self.history_message,
-                        tools=self.tools,
-                    )
+                    for attempt in range(CONTEXT_RETRIES + 1):
+                        self.fit_token_budget()
+                        try:
+                            llm_res: GenericMsg = await provider.acompletions_create(
+                                prompt=prompt,
+                                messages=self.history_message,
+                                tools=tools,
+                                on_delta=live_view or on_delta,
+                                tools_version=self.tool_registry.version,
+                            )
+                            break
+                        except ContextLengthExceededError as e:
+                            # The estimate was off, retry with a history a quarter shorter than the rejected one
+                            rejected_tokens = self.token_counter.total(self.history_message)
+                            self.context_tokens = min(self.context_tokens or rejected_tokens, rejected_tokens * 3 // 4)
+                            if attempt == CONTEXT_RETRIES or len(group_turns(self.history_message[1 if self.sys_prompt else 0:])) <= 1:
+                                log.warning(f"{e}, no older turns left to evict")
+                                return
+                            log.warning(f"{e}, shrink the history to about {self.context_tokens} tokens and retry")
                 except Exception:
                     raise
+                finally:
+                    if live_view:
+                        live_view.close()
 
             if llm_res and llm_res.usage:
                 input_token, output_token = llm_res.usage
@@ -361,27 +443,20 @@ class ChatSession:
             # Push response from LLM, could be tool_calls or just text
             self.history_message.append(llm_res)
             if llm_res.content and not llm_res.toolcalls:
+                if not self.host.interactive or live_view and live_view.rendered:
+                    return
                 console.print("\n 🤖 [bold bright_yellow]Assistant[/bold bright_yellow]:\n")
                 console.print(Markdown(llm_res.content))
                 console.print("\n")
                 return
         else:
             llm_res = self.history_message.pop()
-            console.print("\n 🤖 [bold bright_yellow]Assistant[/bold bright_yellow]:\n")
-            if llm_res.is_tool_res_image():
-                for res in llm_res.message_content:
-                    for content in res.content:
-                        if isinstance(content, types.ImageContent):  
-                            image_bytes = base64.b64decode(content.data)
-                            byte_stream = BytesIO(image_bytes)
-                            console.print(Image(byte_stream))
-            if llm_res.is_tool_res_audio():
-                pass  # TODO
-            console.print("\n")
+            if self.host.interactive:
+                self.render_media(llm_res)
 
             # Remove the image content and add back to history message to avoid erro:
             # "An assistant message with 'tool_calls' must be followed by tool messages responding to each 'tool_call_id'. (insufficient tool messages following tool_calls message)"
-            for res in llm_res.message_content:
+            for res in llm_res.tool_results:
                 non_text_contents: list[types.ContentBlock] = []
                 for content in res.content:
                     if isinstance(content, types.ImageContent) or isinstance(content, types.AudioContent):
@@ -391,191 +466,161 @@ class ChatSession:
                         )
                         non_text_contents.append(content)
                 res.content = non_text_contents
+            llm_res.changed()
             self.history_message.append(llm_res)
             return
         
-        tool_call_results: list[CallToolResultWithID] = []
-        for tool_call in llm_res.toolcalls:
-            id = tool_call.id
-            name = tool_call.name
-            arguments = tool_call.arguments
-            server_name, tool_name = name.split(COMMON_SEPERATOR)
-            if not server_name or not tool_name:
-                raise ValueError(f"Invalid tool name format: {name}")
-
-            server = self.servers.get(server_name, None)
-            if not server:
-                raise ValueError(f"Server not found: {server_name}")
-
-            tool = next((
-                tool for tool in self.tools if tool.name == name), None)
-            tool_call_res: types.CallToolResult = await server.execute_tool(
-                tool=tool,
-                arguments=arguments
-            )
-
-            if tool_call_res.isError:
-                log.warning(
-                    f"Error executing tool: {tool_name}, error is: {tool_call_res.content}")
-
-            result = CallToolResultWithID(
-                tool_call_id=id,
-                name=name,
-                content=tool_call_res.content,
-                isError=tool_call_res.isError
-            )
+        # Dispatch all tool calls of this turn concurrently, gather keeps the results in tool_call_id order
+        tool_call_tasks = [asyncio.ensure_future(self.call_tool(tool_call)) for tool_call in llm_res.toolcalls]
+        try:
+            tool_call_results: list[CallToolResultWithID] = list(await asyncio.gather(*tool_call_tasks))
+        except BaseException:
+            for task in tool_call_tasks:
+                task.cancel()
+            # Wait for the cancelled calls to end, and retrieve the exceptions of the failed ones
+            await asyncio.gather(*tool_call_tasks, return_exceptions=True)
+            raise
 
-            tool_call_results.append(result)
         # Push tool excution result
         self.history_message.append(GenericMsg(
-            message_content=tool_call_results
+            role=Role.TOOL.value,
+            tool_results=tool_call_results
         ))
 
         if len(tool_call_results) > 0:
             await self.run_promt(
                 provider=provider,
-                prompt=""
+                prompt="",
+                on_delta=on_delta
             )
 
-    async def cleanup_servers(self) -> None:
-        """Clean up all servers properly."""
-        # cleanup must follow the FIFO: https://github.com/modelcontextprotocol/python-sdk/issues/577
-        for name, server in reversed(list(self.servers.items())):
-            log.info(f"Shutting down MCP server: [{name}]")
-            await server.cleanup()
-
-    def create_provider(self, base_url: str = None) -> Provider:
-        if ":" not in self.model:
-            raise ValueError("Invalid format! Expected format is 'a:b'")
-
-        provider, model = self.model.split(":", 1)
-        log.info(f"Model loaded: Provider: [{provider}] Model: [{model}]")
-
-        if provider == "openai":
-            api_key = os.environ.get('OPENAI_API_KEY', '')
-            if api_key == "":
-                raise ValueError(
-                    'Environment variable OPENAI_API_KEY not found or its value is empty.')
-            
-            return Openai(model=model, base_url=base_url)  # TODO
-        
-        elif provider == "deepseek":
-            api_key = os.environ.get('OPENAI_API_KEY', '')
-            if api_key == "":
-                raise ValueError(
-                    'Environment variable OPENAI_API_KEY not found or its value is empty.')
-            
-            return Deepseek(model=model, base_url=base_url)  # TODO
-        
-        elif provider == "azure":
-            azure_deploy = os.environ.get('AZURE_OPENAI_DEPLOYMENT', '')
-            azure_api_key = os.environ.get('AZURE_OPENAI_API_KEY', '')
-            azure_api_version = os.environ.get('AZURE_OPENAI_API_VERSION', '')
-            azure_endpoint = os.environ.get('AZURE_OPENAI_ENDPOINT', '')
-
-            if azure_deploy == "" or azure_api_key == "" or azure_api_version == "" or azure_endpoint == "":
-                raise ValueError(
-                    "environment variables missing\n, need 'AZURE_OPENAI_DEPLOYMENT', 'AZURE_OPENAI_API_KEY', 'AZURE_OPENAI_API_VERSION' and 'AZURE_OPENAI_ENDPOINT'.")
-
-            return Azure(model=model)
-
-        elif provider == "ollama":
-            return Ollama(model=model)
-
-        elif provider == "gemini":
-            api_key = os.environ.get('GEMINI_API_KEY', '')
-            if api_key == "":
-                raise ValueError(
-                    'Environment variable GEMINI_API_KEY not found or its value is empty.')
-            
-            return Gemini(model=model)
-        
-        raise ValueError(
-            "Unsupport provider: {provider}, should be in ['openai', 'azure', 'ollama', 'deepseek']")
+    def render_media(self, llm_res: GenericMsg) -> None:
+        console.print("\n 🤖 [bold bright_yellow]Assistant[/bold bright_yellow]:\n")
+        if llm_res.is_tool_res_image():
+            for res in llm_res.tool_results:
+                for content in res.content:
+                    if isinstance(content, types.ImageContent):  
+                        image_bytes = base64.b64decode(content.data)
+                        byte_stream = BytesIO(image_bytes)
+                        console.print(Image(byte_stream))
+        if llm_res.is_tool_res_audio():
+            pass  # TODO
+        console.print("\n")
+
+    async def call_tool(self, tool_call: ToolCall) -> CallToolResultWithID:
+        registered_tool = self.tool_registry.get(tool_call.name)
+        if not registered_tool:
+            # A hallucinated or excluded tool, the LLM is told so and can go on, its tool calls are in the history already
+            log.warning(f"Tool not found: {tool_call.name}")
+            return CallToolResultWithID(
+                tool_call_id=tool_call.id,
+                name=tool_call.name,
+                content=[types.TextContent(type="text", text=f"Tool not found: {tool_call.name}")],
+                isError=True
+            )
 
-    async def run_mcp_host(self):
-        # use register to supply the provider TODO
-        provider = self.create_provider(base_url=self.openai_url)
+        return await self.host.call_tool(registered_tool, tool_call, self.spill_store)
 
-        mcpserver_confs: dict[str, StdioServerParameters] = load_mcp_config(
-            server_conf_path=self.server_conf_path)
+    @property
+    def token_counter(self) -> TokenCounter:
+        """Created on first use, loading the tiktoken encoding is only worth it with a token budget."""
+        if self._token_counter is None:
+            self._token_counter = TokenCounter(self.host.model.split(":", 1)[-1])
+        return self._token_counter
 
-        self.servers = {
-            name: Server(name, srv_config)
-            for name, srv_config in mcpserver_confs.items()
-        }
+    def fit_history(self) -> None:
+        """Prune the history before a new prompt, to the token budget when `context_tokens` is set, to the message window otherwise."""
+        if self.context_tokens:
+            self.fit_token_budget()
+        else:
+            self.history_message = prune_messages(self.history_message, self.message_window, True if self.sys_prompt else False)
 
-        for name, server in self.servers.items():
-            try:
-                log.info(f"Initializing server... [{name}]")
-                initialize_result: types.InitializeResult = await server.initialize(self.debug_model, provider, self.roots)
-                log.info(f"Server connected: [{name}]")
-                console.print(Markdown(format_server_card(initialize_result)))
-                self.initialize_results[name] = initialize_result
-            except Exception as e:
-                await self.cleanup_servers()
-                raise RuntimeError(
-                    f"Failed to initialize server {name}") from e
+    def fit_token_budget(self) -> None:
+        """Evict the oldest turns beyond `context_tokens`, also safe in the middle of a turn."""
+        if self.context_tokens:
+            self.history_message = prune_messages_by_tokens(
+                self.history_message, self.context_tokens, self.token_counter, True if self.sys_prompt else False)
 
-        tools: list[types.Tool] = []
-        for name, server in self.servers.items():
-            if not server:
-                raise RuntimeError(f"Server {name} not initialized")
-            if self.initialize_results.get(name).capabilities.tools:
-                tools_response: list[types.Tool] = await server.list_tools()
-                tools.extend(tools_response)
+    def schedule_compaction(self, provider: Provider) -> None:
+        """Summarize the older turns in the background once the history passes `compact_threshold` tokens.
 
-        log.info(f"Tools loaded, total count: {len(tools)}")
-        self.tools = tools
-        
-        # Treat resource_templates(not resources) as specific tools, similar to GET endpoints in a REST API. 
-        resource_tools: list[types.Tool] = []
-        for name, server in self.servers.items():
-            if not server:
-                raise RuntimeError(f"Server {name} not initialized")
-            if self.initialize_results.get(name).capabilities.resources:
-                try:
-                    resource_templates: list[types.ResourceTemplate] = await server.list_resource_templates()
-                    resource_tools.extend(generated_tools_from_resource_templates(name, resource_templates))
-                except shared.exceptions.McpError as e:
-                    log.info(f"Server {name} does not support resource templates: {e}")
-                    continue
+        The summary replaces the turns when it is ready, until then the turns go to the LLM as they are,
+        so the compaction never delays a prompt.
+        """
+        if not self.compact_threshold or (self._compaction_task and not self._compaction_task.done()):
+            return
+        if self.token_counter.total(self.history_message) <= self.compact_threshold:
+            return
 
-        if len(resource_tools) > 0:
-            self.tools.extend(resource_tools)
-            log.info(f"Resource tools generated, total count: {len(resource_tools)}")
-            console.print(
-                f"[green bold]💌 Extral tools from 'resource templates' generated, count: {len(resource_tools)}. you can check the defails by command: '/tools'[/green bold]")
-            
-        self.resource_tools = resource_tools
+        head = 1 if self.sys_prompt else 0
+        turns = group_turns(self.history_message[head:])
+        if len(turns) <= COMPACT_KEEP_TURNS:
+            return
 
-        resources: dict[str, list[str]] = defaultdict(list)
-        for name, server in self.servers.items():
-            if not server:
-                raise RuntimeError(f"Server {name} not initialized")
+        compacted = [message for turn in turns[:-COMPACT_KEEP_TURNS] for message in turn]
+        self._compaction_task = asyncio.create_task(self.compact_history(provider, compacted), name="compact-history")
+
+    async def compact_history(self, provider: Provider, compacted: list[GenericMsg]) -> None:
+        try:
+            summary = await summarize(provider, compacted)
+        except Exception as e:
+            log.warning(f"Failed to compact history: {e}")
+            return
+        if summary is None:
+            return
 
-            if self.initialize_results.get(name).capabilities.resources:
-                for resource in await server.list_resources():
-                    resources[str(resource.uri)].append(server.name)
-        self.resources = resources
-        log.info(f"Resources loaded, total count: {len(resources)}")
+        head = 1 if self.sys_prompt else 0
+        in_place = self.history_message[head:head + len(compacted)]
+        # The history may have been pruned meanwhile, only replace turns which are still there
+        if len(in_place) != len(compacted) or any(a is not b for a, b in zip(in_place, compacted)):
+            log.info("History changed during compaction, discard the summary")
+            return
 
-        prompts: list[types.Prompt] = []
-        for name, server in self.servers.items():
-            if not server:
-                raise RuntimeError(f"Server {name} not initialized")
+        self.history_message = self.history_message[:head] + [summary] + self.history_message[head + len(compacted):]
+        log.info(f"Compacted {len(compacted)} messages into a summary of about {self.token_counter.message_tokens(summary)} tokens")
+
+    @property
+    def tools(self) -> list[types.Tool]:
+        """Tools offered to the LLM, the catalog without the excluded and filtered ones."""
+        return self.tool_registry.tools
+
+    def server_unavailable(self, name: str) -> bool:
+        if name in self.host.initialize_results:
+            return False
+
+        console.print(f"[magenta]💻 {name}[/magenta]")
+        console.print(f"  [red] 🚫 Server {name} is not available ({self.host.servers[name].status}).[/red]\n")
+        return True
+
+    def close(self) -> None:
+        """Stop the compaction and remove the spilled results of the conversation, the host stays up."""
+        if self._compaction_task:
+            self._compaction_task.cancel()
+        self.spill_store.close()
+
+    def fork(self) -> "ChatSession":
+        """A new conversation on the same host with the settings of this one, and a history and tool exclusions of its own."""
+        return ChatSession(
+            self.host,
+            message_window=self.message_window,
+            sys_prompt=self.sys_prompt,
+            stream=self.stream,
+            context_tokens=self.context_tokens,
+            compact_threshold=self.compact_threshold,
+            compact_model=self.compact_model,
+        )
 
-            if self.initialize_results.get(name).capabilities.prompts:
-                for prompt in await server.list_prompts():
-                    prompts.append(prompt)
-        self.prompts = prompts
-        log.info(f"Prompts loaded, total count: {len(prompts)}")
+    async def run_mcp_host(self):
+        provider = self.host.get_provider()
+        compact_provider = self.host.get_provider(self.compact_model)
 
         try:
+            await self.host.start()
+
             while True:
                 try:
-                    self.history_message = prune_messages(self.history_message, self.message_window, True if self.sys_prompt else False)
-                    user_input = console.input(
+                    self.fit_history()
+                    user_input = await ainput(
                         "[bold magenta]Enter your prompt (Type /help for commands, Ctrl+C to quit)[/bold magenta]\n")
                     
                     print(f"{PREV_LINE}{PREV_LINE}{CLEAR_RIGHT}")
@@ -596,6 +641,7 @@ class ChatSession:
                         prompt=user_input,
                         messages=prompt_messages
                     )
+                    self.schedule_compaction(compact_provider)
 
                 except KeyboardInterrupt:
                     console.print("\n[magenta]Goodbye![/magenta]")
@@ -603,29 +649,94 @@ class ChatSession:
         except Exception:
             raise
         finally:
-            await self.cleanup_servers()
+            self.close()
+            await self.host.close()
 
 
-async def main() -> None:
-    """Initialize and run the chat session."""
-    parser = argparse.ArgumentParser(prog='mcpclihost', description="")
+def add_session_arguments(parser: argparse.ArgumentParser, defaults: bool = True) -> None:
+    """Options of a chat session, shared by the interactive mode and the subcommands.
+
+    argparse sets the defaults of a subcommand over the values given before it, so the subcommands get
+    the options without `defaults` and the root parser's values stay unless they are given again after it.
+    """
+    def default(value: any) -> any:
+        return value if defaults else argparse.SUPPRESS
+
     parser.add_argument('--config', required=False,
-                        help="config file (default is $HOME/mcp.json)")
+                        default=default(None), help="config file (default is $HOME/mcp.json)")
     parser.add_argument('--message-window', required=False, type=int,
-                        default=10, help="number of messages to keep in context")
-    parser.add_argument('-m', '--model', required=True,
-                        help="model to use (format: provider:model, e.g. azure:gpt-4-0613 or ollama:qwen2.5:3b)")
+                        default=default(10), help="number of messages to keep in context")
+    parser.add_argument('--context-tokens', required=False, type=int,
+                        default=default(None), help="token budget of the context, replaces --message-window: oldest turns are evicted to stay within it")
+    parser.add_argument('-m', '--model', required=False,
+                        default=default(None), help="model to use (format: provider:model, e.g. azure:gpt-4-0613 or ollama:qwen2.5:3b)")
     parser.add_argument('--debug', required=False,
-                        action="store_true", help="enable debug logging")
+                        action="store_true", default=default(False), help="enable debug logging")
     parser.add_argument('--base-url', required=False,
-                        help="base URL for OpenAI API (defaults to api.openai.com)")
+                        default=default(None), help="base URL for OpenAI API (defaults to api.openai.com)")
     parser.add_argument('--roots', required=False, nargs='*',
-                        help="clients to expose filesystem “roots” to servers")
+                        default=default(None), help="clients to expose filesystem “roots” to servers")
     parser.add_argument('--sys-prompt', required=False,
-                        help="system prompts to expose to clients")
-    args = parser.parse_args()
+                        default=default(None), help="system prompts to expose to clients")
+    parser.add_argument('--compact-threshold', required=False, type=int,
+                        default=default(None), help="summarize older turns in the background once the history passes this many tokens")
+    parser.add_argument('--compact-model', required=False,
+                        default=default(None), help="model to summarize with, e.g. a cheaper one (same format as --model, defaults to --model)")
+    parser.add_argument('--spill-threshold', required=False, type=int,
+                        default=default(50000), help="tool results longer than this many bytes are kept out of the context, the LLM reads them in parts (0 disables)")
+    parser.add_argument('--startup-timeout', required=False, type=float,
+                        default=default(30.0), help="seconds to wait for MCP servers at startup, slower servers join in the background")
+    parser.add_argument('--no-catalog-cache', required=False, dest="catalog_cache",
+                        action="store_false", default=default(True), help="don't start from, nor save, the on-disk snapshot of server catalogs")
+    parser.add_argument('--lazy', required=False,
+                        action="store_true", default=default(False), help="spawn MCP servers which have a catalog snapshot on first use, and stop them again when idle")
+    parser.add_argument('--tool-cache', required=False,
+                        action="store_true", default=default(False), help="cache the results of read-only tools, see the toolCache section of the config")
+    parser.add_argument('--stderr-log-dir', required=False,
+                        default=default(None), help="write the stderr of each local MCP server to a rotating log file <server>.log in this directory")
+    parser.add_argument('--stream', required=False,
+                        action="store_true", default=default(False), help="stream assistant responses to the terminal as they are generated")
 
-    rich_handler = RichHandler(show_path=False, show_time=False, omit_repeated_times=False, show_level=True, highlighter=NullHighlighter(), rich_tracebacks=True)
+
+async def main() -> None:
+    """Initialize and run the chat session."""
+    parser = argparse.ArgumentParser(prog='mcpclihost', description="")
+    # -m/--model is checked after parsing, it may be given before or after a subcommand
+    add_session_arguments(parser)
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    batch_parser = subparsers.add_parser('batch', help="answer the prompts of a JSONL file without interaction",
+                                         description="Answer every prompt of a JSONL input as an independent conversation, concurrently, on one set of MCP servers. Results go to a JSONL output.")
+    add_session_arguments(batch_parser, defaults=False)
+    batch_parser.add_argument('--input', required=False, default="-",
+                              help="JSONL file with one prompt per line, {\"id\": ..., \"prompt\": ...} (default is stdin)")
+    batch_parser.add_argument('--output', required=False, default="-",
+                              help="JSONL file to write the results to (default is stdout)")
+    batch_parser.add_argument('--workers', required=False, type=int,
+                              default=4, help="number of prompts answered concurrently")
+    serve_parser = subparsers.add_parser('serve', help="serve conversations over an HTTP API",
+                                         description="Serve conversations over an HTTP/JSON API with server-sent events for streaming. Every conversation has its own history, all of them share one set of MCP servers.")
+    add_session_arguments(serve_parser, defaults=False)
+    serve_parser.add_argument('--host', required=False, default="127.0.0.1",
+                              help="address to listen on")
+    serve_parser.add_argument('--port', required=False, type=int,
+                              default=8000, help="port to listen on")
+    serve_parser.add_argument('--conversation-ttl', required=False, type=float,
+                              default=3600.0, help="seconds after which an unused conversation is ended")
+    serve_parser.add_argument('--max-conversations', required=False, type=int,
+                              default=1000, help="number of conversations which may exist at once")
+    args = parser.parse_args()
+    if not args.model:
+        parser.error("the following arguments are required: -m/--model")
+    if args.command == "batch" and args.workers < 1:
+        batch_parser.error("--workers must be at least 1")
+    if args.command == "serve" and (args.conversation_ttl <= 0 or args.max_conversations < 1):
+        serve_parser.error("--conversation-ttl must be positive and --max-conversations at least 1")
+
+    interactive = args.command is None
+    if not interactive:
+        # stdout may carry the results, everything else goes to stderr
+        console.stderr = True
+    rich_handler = RichHandler(console=console, show_path=False, show_time=False, omit_repeated_times=False, show_level=True, highlighter=NullHighlighter(), rich_tracebacks=True)
     if args.debug:
         FORMAT = "%(asctime)s <%(filename)s:%(lineno)d> %(message)s"
         rich_handler.setFormatter(logging.Formatter(FORMAT))
@@ -638,16 +749,35 @@ async def main() -> None:
         log.setLevel(logging.INFO)
     
     try:
-        chat_session = ChatSession(
+        host = McpHost(
             model=args.model,
             server_conf_path=args.config,
             openai_url=args.base_url,
-            message_window=args.message_window,
             debug_model=args.debug,
             roots=args.roots,
-            sys_prompt=args.sys_prompt)
-        
-        await chat_session.run_mcp_host()
+            startup_timeout=args.startup_timeout,
+            catalog_cache=args.catalog_cache,
+            lazy=args.lazy,
+            spill_threshold=args.spill_threshold,
+            stderr_log_dir=args.stderr_log_dir,
+            tool_cache=args.tool_cache,
+            interactive=interactive)
+        chat_session = ChatSession(
+            host,
+            message_window=args.message_window,
+            sys_prompt=args.sys_prompt,
+            stream=args.stream,
+            context_tokens=args.context_tokens,
+            compact_threshold=args.compact_threshold,
+            compact_model=args.compact_model)
+
+        if args.command == "batch":
+            await run_batch(chat_session, input_path=args.input, output_path=args.output, workers=args.workers)
+        elif args.command == "serve":
+            await run_serve(chat_session, host=args.host, port=args.port,
+                            idle_ttl=args.conversation_ttl, max_conversations=args.max_conversations)
+        else:
+            await chat_session.run_mcp_host()
     except Exception as e:
         traceback.print_exception(e)
         log.error(f"{e}")
@@ -655,7 +785,10 @@ async def main() -> None:
         parser.print_help()
 
 def run():
-    asyncio.run(main())
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
 
 if __name__ == '__main__':
     asyncio.run(main())
\ No newline at end of file
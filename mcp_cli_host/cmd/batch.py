@@ -0,0 +1,178 @@
+from mcp_cli_host.llm.base_provider import Provider
+from mcp_cli_host.llm.models import GenericMsg, Role
+from mcp import types
+from pydantic import BaseModel, Field, ValidationError
+from typing import Any, IO, Iterator, TYPE_CHECKING
+import asyncio
+import json
+import logging
+import sys
+import time
+
+if TYPE_CHECKING:
+    from mcp_cli_host.cmd.app import ChatSession
+
+log = logging.getLogger("mcp_cli_host")
+
+
+class BatchPrompt(BaseModel):
+    """A line of the batch input, a JSON object like `{"id": "q1", "prompt": "..."}`."""
+    id: str | int | None = None
+    """(Optional) Identifies the prompt in the output, its line number by default."""
+
+    prompt: str
+
+
+class ToolCallTrace(BaseModel):
+    name: str
+    arguments: dict[str, Any]
+    is_error: bool = False
+    result: str = ""
+
+
+class TokenUsage(BaseModel):
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+
+class BatchResult(BaseModel):
+    """A line of the batch output, written as soon as its conversation is done."""
+    id: str | int | None = None
+    prompt: str | None = None
+    response: str | None = None
+    tool_calls: list[ToolCallTrace] = Field(default_factory=list)
+    usage: TokenUsage = Field(default_factory=TokenUsage)
+    duration: float = 0.0
+    error: str | None = None
+
+
+def trace_conversation(messages: list[GenericMsg]) -> BatchResult:
+    """Collect the answer, the tool calls with their results and the token usage of the messages of a conversation."""
+    result = BatchResult()
+    calls: dict[str, ToolCallTrace] = {}
+    for msg in messages:
+        if msg.usage:
+            input_tokens, output_tokens = msg.usage
+            result.usage.input_tokens += input_tokens or 0
+            result.usage.output_tokens += output_tokens or 0
+
+        if msg.role == Role.ASSISTANT.value:
+            for tool_call in msg.tool_calls:
+                trace = ToolCallTrace(name=tool_call.name, arguments=tool_call.arguments)
+                calls[tool_call.id] = trace
+                result.tool_calls.append(trace)
+            if msg.content and not msg.tool_calls:
+                result.response = msg.content if isinstance(msg.content, str) else json.dumps(msg.content, ensure_ascii=False)
+
+        for res in msg.tool_results:
+            trace = calls.get(res.tool_call_id)
+            if trace is None:
+                continue
+            trace.is_error = res.isError
+            trace.result = "\n".join(content.text for content in res.content if isinstance(content, types.TextContent))
+
+    return result
+
+
+def read_prompts(lines: IO[str]) -> Iterator[BatchPrompt | BatchResult]:
+    """Parse the batch input, a line which is not a prompt gives a result with its error right away."""
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+            if isinstance(data, str):
+                data = {"prompt": data}
+            prompt = BatchPrompt.model_validate(data)
+        except (ValueError, ValidationError) as e:
+            yield BatchResult(id=number, error=f"Invalid prompt on line {number}: {e}")
+            continue
+
+        if prompt.id is None:
+            prompt.id = number
+        yield prompt
+
+
+class BatchRunner:
+    """Runs the prompts of a batch as independent conversations, `workers` at a time.
+
+    All conversations are forks of one session, they share the servers, catalog and caches of its host, while every
+    prompt starts from an empty history. Prompts are read as workers become free, so the input may be arbitrarily long.
+    """
+
+    def __init__(self, session: "ChatSession", provider: Provider, workers: int = 4) -> None:
+        self.session = session
+        self.provider = provider
+        self.workers = workers
+        self.done: int = 0
+        self.failed: int = 0
+
+    async def run_prompt(self, prompt: BatchPrompt) -> BatchResult:
+        conversation = self.session.fork()
+        start = len(conversation.history_message)
+        started = time.perf_counter()
+        error: str | None = None
+        try:
+            await conversation.run_promt(provider=self.provider, prompt=prompt.prompt)
+        except Exception as e:
+            log.error(f"Prompt {prompt.id} failed: {e}")
+            error = str(e) or type(e).__name__
+        finally:
+            conversation.close()
+
+        # The latest turn is never evicted, the history from `start` on is this prompt's turn
+        result = trace_conversation(conversation.history_message[start:])
+        result.id = prompt.id
+        result.prompt = prompt.prompt
+        result.duration = round(time.perf_counter() - started, 3)
+        result.error = error or (None if result.response is not None else "No response from the LLM")
+        return result
+
+    async def run(self, lines: IO[str], output: IO[str]) -> None:
+        queue: asyncio.Queue[BatchPrompt | BatchResult | None] = asyncio.Queue(maxsize=self.workers * 2)
+
+        def write(result: BatchResult) -> None:
+            output.write(result.model_dump_json(exclude_none=True) + "\n")
+            output.flush()
+            self.done += 1
+            if result.error:
+                self.failed += 1
+
+        async def feed() -> None:
+            prompts = read_prompts(lines)
+            while True:
+                # Reading may block, e.g. on stdin
+                prompt = await asyncio.to_thread(next, prompts, None)
+                if prompt is None:
+                    break
+                await queue.put(prompt)
+            for _ in range(self.workers):
+                await queue.put(None)
+
+        async def work() -> None:
+            while (prompt := await queue.get()) is not None:
+                write(prompt if isinstance(prompt, BatchResult) else await self.run_prompt(prompt))
+
+        await asyncio.gather(feed(), *[work() for _ in range(self.workers)])
+
+
+async def run_batch(session: "ChatSession", input_path: str = "-", output_path: str = "-", workers: int = 4) -> None:
+    """Start the servers of the session's host once, then answer every prompt of the JSONL input into the JSONL output."""
+    host = session.host
+    provider = host.get_provider()
+
+    lines = sys.stdin if input_path == "-" else open(input_path, "r", encoding="utf-8")
+    output = sys.stdout if output_path == "-" else open(output_path, "w", encoding="utf-8")
+    runner = BatchRunner(session, provider, workers)
+    started = time.perf_counter()
+    try:
+        await host.start()
+        await runner.run(lines, output)
+    finally:
+        await host.close()
+        if lines is not sys.stdin:
+            lines.close()
+        if output is not sys.stdout:
+            output.close()
+
+    log.info(f"Batch done: {runner.done} prompts, {runner.failed} failed, in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,206 @@
+from mcp import types
+from mcp.shared.exceptions import McpError
+from mcp_cli_host.cmd.mcp import Server, ToolFilter
+from mcp_cli_host.cmd.mcp_client_functions.notification_handler import ListKind
+from mcp_cli_host.cmd.spill import HOST_SERVER_NAME
+from mcp_cli_host.cmd.utils import COMMON_SEPERATOR, generated_tools_from_resource_templates
+from pydantic import BaseModel, Field
+from collections import defaultdict
+from typing import Awaitable
+import asyncio
+import itertools
+import logging
+
+log = logging.getLogger("mcp_cli_host")
+
+# Versions of all tool registries, conversations share a provider which caches its tool payload by version
+_registry_versions = itertools.count(1)
+
+
+class ServerCatalog(BaseModel):
+    """Everything one server offers, names are already prefixed with the server name."""
+    tools: list[types.Tool] = Field(default_factory=list)
+    resource_templates: list[types.ResourceTemplate] = Field(default_factory=list)
+    # Tools generated from `resource_templates`, similar to GET endpoints in a REST API
+    resource_tools: list[types.Tool] = Field(default_factory=list)
+    resources: list[types.Resource] = Field(default_factory=list)
+    prompts: list[types.Prompt] = Field(default_factory=list)
+
+
+class Catalog:
+    """Consolidated catalog of all servers.
+
+    The merged views are rebuilt whenever a server's entry changes, so reading them is free.
+    `version` is bumped on every change.
+    """
+
+    def __init__(self) -> None:
+        self.servers: dict[str, ServerCatalog] = {}
+        self.version: int = 0
+        self.tools: list[types.Tool] = []
+        self.resource_tools: list[types.Tool] = []
+        self.resources: dict[str, list[str]] = defaultdict(list)
+        self.prompts: list[types.Prompt] = []
+
+    def __contains__(self, server_name: str) -> bool:
+        return server_name in self.servers
+
+    def update(self, server_name: str, server_catalog: ServerCatalog) -> None:
+        self.servers[server_name] = server_catalog
+        self._rebuild()
+
+    def remove(self, server_name: str) -> None:
+        if self.servers.pop(server_name, None) is not None:
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        tools: list[types.Tool] = []
+        resource_tools: list[types.Tool] = []
+        resources: dict[str, list[str]] = defaultdict(list)
+        prompts: list[types.Prompt] = []
+
+        for server_name, server_catalog in self.servers.items():
+            tools.extend(server_catalog.tools)
+            resource_tools.extend(server_catalog.resource_tools)
+            for resource in server_catalog.resources:
+                resources[str(resource.uri)].append(server_name)
+            prompts.extend(server_catalog.prompts)
+
+        self.tools = tools + resource_tools
+        self.resource_tools = resource_tools
+        self.resources = resources
+        self.prompts = prompts
+        self.version += 1
+
+
+class RegisteredTool(BaseModel):
+    """A tool of the catalog with its qualified name already split."""
+    tool: types.Tool
+    server_name: str
+    tool_name: str
+
+
+class ToolRegistry:
+    """Tools offered to the LLM, indexed by qualified name (`server--tool`).
+
+    The index follows the catalog, it is rebuilt on the first access after the catalog's `version` changed.
+    A tool is offered unless it is excluded at runtime or not permitted by the tool filter of the configuration,
+    which is evaluated once per rebuild. `version` changes whenever the offered tools change, and is unique
+    across registries, so the registries of different conversations never share one.
+    """
+
+    def __init__(self, catalog: Catalog, tool_filter: ToolFilter | None = None) -> None:
+        self.catalog = catalog
+        self.tool_filter: ToolFilter = tool_filter or ToolFilter()
+        self.excluded: set[str] = set()
+        self.version: int = 0
+        self._catalog_version: int | None = None
+        self._entries: dict[str, RegisteredTool] = {}
+        self._by_tool_name: dict[str, list[str]] = {}
+        self._offered: dict[str, RegisteredTool] = {}
+        self._offered_tools: list[types.Tool] = []
+
+    def _sync(self) -> None:
+        if self._catalog_version == self.catalog.version:
+            return
+
+        entries: dict[str, RegisteredTool] = {}
+        by_tool_name: dict[str, list[str]] = defaultdict(list)
+        for tool in self.catalog.tools:
+            server_name, _, tool_name = tool.name.partition(COMMON_SEPERATOR)
+            entries[tool.name] = RegisteredTool(tool=tool, server_name=server_name, tool_name=tool_name)
+            by_tool_name[tool_name].append(tool.name)
+
+        self._entries = entries
+        self._by_tool_name = by_tool_name
+        self._catalog_version = self.catalog.version
+        self._select()
+
+    def _select(self) -> None:
+        # The tools of the host itself aren't subject to the filter, e.g. the spill previews ask the LLM to call one
+        self._offered = {
+            name: entry for name, entry in self._entries.items()
+            if name not in self.excluded and (entry.server_name == HOST_SERVER_NAME or self.tool_filter.permits(name))
+        }
+        self._offered_tools = [entry.tool for entry in self._offered.values()]
+        self.version = next(_registry_versions)
+
+    @property
+    def tools(self) -> list[types.Tool]:
+        self._sync()
+        return self._offered_tools
+
+    def get(self, name: str) -> RegisteredTool | None:
+        """Look up an offered tool by its qualified name."""
+        self._sync()
+        return self._offered.get(name)
+
+    def offers(self, name: str) -> bool:
+        self._sync()
+        return name in self._offered
+
+    def exclude(self, name: str) -> list[str]:
+        """Exclude a tool by its qualified name, or every tool with exactly this name on any server.
+
+        Returns:
+            The qualified names of the excluded tools, empty if none matched.
+        """
+        self._sync()
+        names = [name] if name in self._entries else self._by_tool_name.get(name, [])
+        if names:
+            self.excluded.update(names)
+            self._select()
+        return names
+
+
+async def discover_server(
+    server: Server,
+    capabilities: types.ServerCapabilities,
+    kinds: set[ListKind] | None = None,
+    base: ServerCatalog | None = None,
+) -> ServerCatalog:
+    """List everything the server offers according to its capabilities, all list calls run concurrently.
+
+    A failing list call is logged and leaves its part of the catalog as it is in `base`, empty without one,
+    so a refresh which fails doesn't drop what the server offered so far.
+
+    Args:
+        server: the server to list.
+        capabilities: capabilities the server announced at initialization.
+        kinds: only refresh these parts, e.g. after a list changed notification, all parts by default.
+        base: catalog to copy the parts which are not refreshed from.
+    """
+    kinds = kinds if kinds is not None else {"tools", "resources", "prompts"}
+    calls: dict[str, Awaitable[list[any]]] = {}
+    if capabilities.tools and "tools" in kinds:
+        calls["tools"] = server.list_tools()
+    if capabilities.resources and "resources" in kinds:
+        calls["resource_templates"] = server.list_resource_templates()
+        calls["resources"] = server.list_resources()
+    if capabilities.prompts and "prompts" in kinds:
+        calls["prompts"] = server.list_prompts()
+
+    server_catalog = base.model_copy() if base else ServerCatalog()
+    results = await asyncio.gather(*calls.values(), return_exceptions=True)
+    for kind, result in zip(calls, results):
+        if isinstance(result, McpError) and kind == "resource_templates":
+            log.info(f"Server {server.name} does not support resource templates: {result}")
+            result = []
+        if isinstance(result, Exception):
+            log.error(f"Failed to list {kind} of server {server.name}: {result}")
+            continue
+        if isinstance(result, BaseException):
+            raise result
+        setattr(server_catalog, kind, result)
+        if kind == "resource_templates":
+            server_catalog.resource_tools = generated_tools_from_resource_templates(server.name, server_catalog.resource_templates, server.resource_templates)
+    return server_catalog
+
+
+async def discover(servers: list[Server], initialize_results: dict[str, types.InitializeResult]) -> dict[str, ServerCatalog]:
+    """Fan the discovery out across all servers, returns the catalog of each server by name."""
+    server_catalogs = await asyncio.gather(*[
+        discover_server(server, initialize_results[server.name].capabilities) for server in servers
+    ])
+
+    return {server.name: server_catalog for server, server_catalog in zip(servers, server_catalogs)}
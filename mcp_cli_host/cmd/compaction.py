@@ -0,0 +1,59 @@
+from mcp_cli_host.llm.base_provider import Provider
+from mcp_cli_host.llm.models import GenericMsg, Role
+from mcp import types
+import json
+import logging
+
+log = logging.getLogger("mcp_cli_host")
+
+# Longest text of a single tool result which goes into the transcript to summarize
+MAX_TOOL_RESULT_CHARS = 2000
+
+SUMMARY_INSTRUCTION = """You compact the history of a conversation between a user and an assistant which uses tools.
+Summarize the transcript below so the assistant can continue the conversation without it: keep the user's goals,
+decisions, facts and names, results of tool calls which are still relevant and open questions. Be concise, answer
+with the summary only."""
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+def render_transcript(messages: list[GenericMsg]) -> str:
+    """Plain text form of messages, tool calls and results included, to be read by the summarizing LLM."""
+    lines: list[str] = []
+    for msg in messages:
+        if msg.is_tool_res():
+            for res in msg.tool_results:
+                text = "\n".join(content.text for content in res.content if isinstance(content, types.TextContent))
+                if len(text) > MAX_TOOL_RESULT_CHARS:
+                    text = text[:MAX_TOOL_RESULT_CHARS] + " ..."
+                lines.append(f"[tool result {res.name}]: {text}")
+            continue
+
+        if msg.content:
+            content = msg.content if isinstance(msg.content, str) else json.dumps(msg.content, ensure_ascii=False, default=str)
+            lines.append(f"[{msg.role}]: {content}")
+        for tool_call in msg.tool_calls:
+            lines.append(f"[{msg.role} calls tool {tool_call.name}]: {json.dumps(tool_call.arguments, ensure_ascii=False)}")
+
+    return "\n".join(lines)
+
+
+async def summarize(provider: Provider, messages: list[GenericMsg]) -> GenericMsg | None:
+    """Summarize messages into one system message, None if the LLM answered nothing."""
+    llm_res = await provider.acompletions_create(
+        prompt="",
+        messages=[
+            GenericMsg(role=Role.SYSTEM.value, content=SUMMARY_INSTRUCTION),
+            GenericMsg(role=Role.USER.value, content=render_transcript(messages)),
+        ],
+        tools=[],
+    )
+
+    if not llm_res or not llm_res.content:
+        return None
+
+    if llm_res.usage:
+        input_token, output_token = llm_res.usage
+        log.info(f"Token usage statistics of compaction: Input: {input_token}, Output: {output_token}")
+
+    return GenericMsg(role=Role.SYSTEM.value, content=SUMMARY_PREFIX + llm_res.content)
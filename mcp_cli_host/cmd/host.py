@@ -0,0 +1,423 @@
+from mcp_cli_host.llm.gemini.provider import Gemini
+from mcp_cli_host.llm.azure.provider import Azure
+from mcp_cli_host.llm.openai.provider import Openai
+from mcp_cli_host.llm.deepseek.provider import Deepseek
+from mcp_cli_host.llm.ollama.provider import Ollama
+from mcp_cli_host.llm.base_provider import Provider
+from mcp_cli_host.llm.models import CallToolResultWithID, ToolCall
+from mcp_cli_host.cmd.mcp import load_mcp_config, load_server_options, load_tool_filter, load_tool_cache_options, Server, ToolFilter
+from mcp_cli_host.cmd.catalog import Catalog, RegisteredTool, ServerCatalog, ListKind, discover, discover_server
+from mcp_cli_host.cmd.result_cache import ToolResultCache
+from mcp_cli_host.cmd.spill import SpillStore, HOST_SERVER_NAME, READ_SPILLED_TOOL, DEFAULT_READ_LENGTH, read_spilled_tool
+from mcp_cli_host.cmd.snapshot import CatalogSnapshot, load_snapshot, save_snapshot
+from mcp_cli_host.console import console
+from mcp_cli_host.cmd.utils import format_server_card, PREFIX_RESOURCE_TOOL
+from mcp import types, StdioServerParameters
+from rich.markdown import Markdown
+from collections import defaultdict
+import asyncio
+import logging
+import os
+
+log = logging.getLogger("mcp_cli_host")
+
+
+class McpHost:
+    """What all conversations have in common: the MCP servers, their catalog, the caches and the LLM providers.
+
+    The configuration is loaded on creation, the servers are started by `start`. A `ChatSession` holds one
+    conversation on a host, any number of them can run on the same host at once.
+    """
+
+    def __init__(self,
+                 model: str,
+                 server_conf_path: str = None,
+                 openai_url: str = None,
+                 debug_model: bool = False,
+                 roots: list[str] = None,
+                 startup_timeout: float = 30.0,
+                 catalog_cache: bool = True,
+                 lazy: bool = False,
+                 spill_threshold: int = 50000,
+                 stderr_log_dir: str = None,
+                 tool_cache: bool = False,
+                 interactive: bool = True
+                 ) -> None:
+        self.model = model
+        self.server_conf_path = server_conf_path
+        self.openai_url = openai_url
+        self.debug_model = debug_model
+        self.roots = roots
+        self.startup_timeout = startup_timeout
+        self.catalog_cache = catalog_cache
+        self.lazy = lazy
+        # Large results are spilled to a store of the conversation which called the tool, see `ChatSession`
+        self.spill_threshold = spill_threshold
+        self.stderr_log_dir = stderr_log_dir
+        self.tool_cache = tool_cache
+        # Without a terminal to talk to, e.g. in batch mode: nothing is rendered and servers can't ask the user
+        self.interactive = interactive
+        self.result_cache: ToolResultCache = ToolResultCache()
+        self.tool_filter: ToolFilter = ToolFilter()
+        self._providers: dict[str, Provider] = {}
+        self.servers: dict[str, Server] = {}
+        self.initialize_results: dict[str, types.InitializeResult] = {}
+        self.catalog: Catalog = Catalog()
+        self._stale_catalog_kinds: dict[str, set[ListKind]] = defaultdict(set)
+        self._refresh_tasks: dict[str, asyncio.Task] = {}
+        self.snapshots: dict[str, CatalogSnapshot] = {}
+        # Servers whose catalog entry comes from a live discovery rather than a snapshot
+        self.live_catalogs: set[str] = set()
+        # Lazy servers which start from their snapshot, they are spawned on first use
+        self.deferred: set[str] = set()
+        self.startup_tasks: dict[str, asyncio.Task] = {}
+        self._catalog_loaded: asyncio.Event = asyncio.Event()
+        self.load_servers()
+
+    def get_provider(self, model: str = None) -> Provider:
+        """The provider of `model`, `--model` by default, created once and shared by all conversations."""
+        model = model or self.model
+        if model not in self._providers:
+            self._providers[model] = self.create_provider(base_url=self.openai_url, model=model)
+        return self._providers[model]
+
+    async def start(self) -> None:
+        """Start the servers and load their catalog, `close` has to follow even if it fails."""
+        await self.start_servers(self.get_provider())
+        await self.load_catalog()
+
+    async def close(self) -> None:
+        await self.cleanup_servers()
+
+    def load_servers(self) -> None:
+        """Create the configured servers and seed the catalog from their snapshots, nothing is started yet."""
+        mcpserver_confs: dict[str, StdioServerParameters] = load_mcp_config(
+            server_conf_path=self.server_conf_path)
+        if HOST_SERVER_NAME in mcpserver_confs:
+            # Its tools would be mixed up with the ones the host offers itself
+            raise ValueError(f"Server name '{HOST_SERVER_NAME}' is reserved for the tools of the host, rename the server in the config")
+
+        server_options = load_server_options(server_conf_path=self.server_conf_path)
+        self.tool_filter = load_tool_filter(server_conf_path=self.server_conf_path)
+        tool_cache_options = load_tool_cache_options(server_conf_path=self.server_conf_path)
+        if self.tool_cache:
+            tool_cache_options.enabled = True
+        self.result_cache = ToolResultCache(tool_cache_options)
+
+        self.servers = {
+            name: Server(name, srv_config, server_options.get(name))
+            for name, srv_config in mcpserver_confs.items()
+        }
+        for server in self.servers.values():
+            server.on_list_changed = self.on_list_changed
+            server.on_resource_updated = self.on_resource_updated
+            server.on_reconnected = self.on_reconnected
+            server.on_spawned = self.on_spawned
+            server.interactive = self.interactive
+            server.ready_timeout = self.startup_timeout
+            if self.lazy:
+                server.options.lazy = True
+            if self.stderr_log_dir and not server.stderr.log_path:
+                server.stderr.log_path = os.path.join(self.stderr_log_dir, f"{server.name}.log")
+
+        if self.catalog_cache:
+            self.load_snapshots()
+
+    def load_snapshots(self) -> None:
+        """Seed the catalog with the on-disk snapshots, those servers don't hold up the prompt at startup."""
+        for name, server in self.servers.items():
+            snapshot = load_snapshot(name, server.config)
+            if not snapshot:
+                continue
+
+            self.snapshots[name] = snapshot
+            self.initialize_results[name] = snapshot.initialize_result
+            self.catalog.update(name, snapshot.catalog)
+            log.info(f"Catalog snapshot loaded: [{name}] version {snapshot.server_version}")
+
+    def create_provider(self, base_url: str = None, model: str = None) -> Provider:
+        model = model or self.model
+        if ":" not in model:
+            raise ValueError("Invalid format! Expected format is 'a:b'")
+
+        provider, model = model.split(":", 1)
+        log.info(f"Model loaded: Provider: [{provider}] Model: [{model}]")
+
+        if provider == "openai":
+            api_key = os.environ.get('OPENAI_API_KEY', '')
+            if api_key == "":
+                raise ValueError(
+                    'Environment variable OPENAI_API_KEY not found or its value is empty.')
+            
+            return Openai(model=model, base_url=base_url)  # TODO
+        
+        elif provider == "deepseek":
+            api_key = os.environ.get('OPENAI_API_KEY', '')
+            if api_key == "":
+                raise ValueError(
+                    'Environment variable OPENAI_API_KEY not found or its value is empty.')
+            
+            return Deepseek(model=model, base_url=base_url)  # TODO
+        
+        elif provider == "azure":
+            azure_deploy = os.environ.get('AZURE_OPENAI_DEPLOYMENT', '')
+            azure_api_key = os.environ.get('AZURE_OPENAI_API_KEY', '')
+            azure_api_version = os.environ.get('AZURE_OPENAI_API_VERSION', '')
+            azure_endpoint = os.environ.get('AZURE_OPENAI_ENDPOINT', '')
+
+            if azure_deploy == "" or azure_api_key == "" or azure_api_version == "" or azure_endpoint == "":
+                raise ValueError(
+                    "environment variables missing\n, need 'AZURE_OPENAI_DEPLOYMENT', 'AZURE_OPENAI_API_KEY', 'AZURE_OPENAI_API_VERSION' and 'AZURE_OPENAI_ENDPOINT'.")
+
+            return Azure(model=model)
+
+        elif provider == "ollama":
+            return Ollama(model=model)
+
+        elif provider == "gemini":
+            api_key = os.environ.get('GEMINI_API_KEY', '')
+            if api_key == "":
+                raise ValueError(
+                    'Environment variable GEMINI_API_KEY not found or its value is empty.')
+            
+            return Gemini(model=model)
+        
+        raise ValueError(
+            "Unsupport provider: {provider}, should be in ['openai', 'azure', 'ollama', 'deepseek']")
+
+    async def start_servers(self, provider: Provider) -> None:
+        """Initialize all servers concurrently, waiting at most `startup_timeout` seconds.
+
+        Servers which are not ready by then are marked degraded and keep connecting in the background,
+        a failing server doesn't abort the session. Servers with a catalog snapshot are not waited for at all,
+        lazy ones among them are not even spawned.
+        """
+        for name, server in self.servers.items():
+            server.configure(self.debug_model, provider, self.roots)
+            if server.options.lazy and name in self.snapshots:
+                server.status = "idle"
+                self.deferred.add(name)
+
+        loop = asyncio.get_running_loop()
+        settled: dict[str, asyncio.Future] = {name: loop.create_future() for name in self.servers if name not in self.deferred}
+        self.startup_tasks = {
+            name: asyncio.create_task(self.start_server(name, self.servers[name], provider, settled[name]), name=f"start-{name}")
+            for name in settled
+        }
+        awaited = [future for name, future in settled.items() if name not in self.snapshots]
+        if not awaited:
+            return
+
+        await asyncio.wait(awaited, timeout=self.startup_timeout)
+
+        for name, server in self.servers.items():
+            if name in settled and server.status != "ready" and name not in self.snapshots:
+                server.status = "degraded"
+                log.warning(f"Server [{name}] is not available after {self.startup_timeout}s, continue without it and keep retrying in the background")
+
+    async def start_server(self, name: str, server: Server, provider: Provider, settled: asyncio.Future | None = None, retries: int = 3, delay: float = 1.0) -> None:
+        """Initialize one server with exponential backoff, its catalog is loaded if it gets ready after startup.
+
+        `settled` is resolved once the server is connected, or after `retries` failed attempts. The attempts
+        go on in the background from then on, up to `maxReconnectDelay` seconds apart, until cleanup.
+        """
+        attempt = 0
+        while True:
+            try:
+                log.info(f"Initializing server... [{name}]")
+                initialize_result: types.InitializeResult = await server.initialize(self.debug_model, provider, self.roots)
+                break
+            except Exception as e:
+                attempt += 1
+                server.status = "degraded"
+                if attempt == retries:
+                    log.error(f"Failed to initialize server {name} after {attempt} attempts, keep retrying in the background: {e}")
+                    if settled and not settled.done():
+                        settled.set_result(False)
+                    if name not in self.live_catalogs:
+                        # Don't offer tools from a snapshot which can't be called, until the server is up
+                        self.catalog.remove(name)
+                        self.initialize_results.pop(name, None)
+                elif attempt < retries:
+                    log.warning(f"Failed to initialize server {name}: {e}. Attempt {attempt} of {retries}, retrying in {delay} seconds...")
+                else:
+                    log.debug(f"Failed to initialize server {name}: {e}. Attempt {attempt}, retrying in {delay} seconds...")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, server.options.max_reconnect_delay)
+
+        log.info(f"Server connected: [{name}] in {server.init_time:.2f}s")
+        console.print(Markdown(format_server_card(initialize_result, server.init_time)))
+        snapshot = self.snapshots.get(name)
+        if snapshot and snapshot.server_version != initialize_result.serverInfo.version:
+            log.info(f"Server [{name}] changed from version {snapshot.server_version} to {initialize_result.serverInfo.version}, discard its catalog snapshot")
+            self.catalog.remove(name)
+        self.initialize_results[name] = initialize_result
+        if settled and not settled.done():
+            settled.set_result(True)
+
+        # A server which missed the startup deadline, or started from a snapshot, gets its live catalog as soon as it is ready
+        await self._catalog_loaded.wait()
+        if name not in self.live_catalogs:
+            await self.load_server_catalog(name)
+            if not snapshot:
+                console.print(f"[green bold]💻 Server '{name}' is available now, you can check its tools by command: '/tools'[/green bold]")
+
+    async def load_catalog(self) -> None:
+        """Discover tools, resource templates, resources and prompts of all ready servers in one concurrent pass."""
+        ready_servers = [server for server in self.servers.values() if server.status == "ready"]
+        for name, server_catalog in (await discover(ready_servers, self.initialize_results)).items():
+            self.update_catalog(name, server_catalog)
+
+        log.info(f"Tools loaded, total count: {len(self.catalog.tools) - len(self.catalog.resource_tools)}")
+        if len(self.catalog.resource_tools) > 0:
+            log.info(f"Resource tools generated, total count: {len(self.catalog.resource_tools)}")
+            console.print(
+                f"[green bold]💌 Extral tools from 'resource templates' generated, count: {len(self.catalog.resource_tools)}. you can check the defails by command: '/tools'[/green bold]")
+        log.info(f"Resources loaded, total count: {len(self.catalog.resources)}")
+        log.info(f"Prompts loaded, total count: {len(self.catalog.prompts)}")
+        self._catalog_loaded.set()
+
+    async def load_server_catalog(self, name: str) -> None:
+        server_catalog = await discover_server(self.servers[name], self.initialize_results[name].capabilities)
+        self.update_catalog(name, server_catalog)
+
+    def update_catalog(self, name: str, server_catalog: ServerCatalog) -> None:
+        """Replace a server's catalog entry with live data and persist it as snapshot for the next start."""
+        self.catalog.update(name, server_catalog)
+        self.live_catalogs.add(name)
+        # The tools may behave differently now
+        self.result_cache.invalidate(name)
+        if self.catalog_cache:
+            save_snapshot(name, self.servers[name].config, self.initialize_results[name], server_catalog)
+
+    def on_list_changed(self, name: str, kind: ListKind) -> None:
+        """Invalidate part of a server's catalog after a list changed notification.
+
+        The refresh runs in a background task, notifications arriving meanwhile are coalesced into its next round.
+        """
+        if name not in self.live_catalogs and name not in self.deferred:
+            # The live discovery of the server is still to come
+            return
+
+        self.schedule_refresh(name, {kind})
+
+    def on_reconnected(self, name: str, initialize_result: types.InitializeResult) -> None:
+        """Rediscover the whole catalog of a server which lost its connection, it may have come back changed."""
+        self.initialize_results[name] = initialize_result
+        self.schedule_refresh(name, {"tools", "resources", "prompts"})
+
+    def on_spawned(self, name: str, initialize_result: types.InitializeResult) -> None:
+        """Validate the catalog of a lazy server once it is live, it came from a snapshot or an earlier process.
+
+        The catalog is discovered in the background when it is not live yet, or when the server changed its version.
+        """
+        known = self.initialize_results.get(name)
+        changed = known is not None and known.serverInfo.version != initialize_result.serverInfo.version
+        self.initialize_results[name] = initialize_result
+        if changed:
+            log.info(f"Server [{name}] changed from version {known.serverInfo.version} to {initialize_result.serverInfo.version}, discard its catalog")
+            # Without a base, parts which fail to list aren't taken from the outdated catalog
+            self.catalog.remove(name)
+            self.live_catalogs.discard(name)
+        if changed or name not in self.live_catalogs:
+            self.schedule_refresh(name, {"tools", "resources", "prompts"})
+
+    def schedule_refresh(self, name: str, kinds: set[ListKind]) -> None:
+        self._stale_catalog_kinds[name].update(kinds)
+        refresh_task = self._refresh_tasks.get(name)
+        if refresh_task is None or refresh_task.done():
+            self._refresh_tasks[name] = asyncio.create_task(self.refresh_server_catalog(name), name=f"refresh-{name}")
+
+    def on_resource_updated(self, name: str, uri: str) -> None:
+        """Drop the cached results of a server's resource template tools, one of them may have read the updated resource."""
+        dropped = self.result_cache.invalidate(name, tool_prefix=PREFIX_RESOURCE_TOOL)
+        if dropped:
+            log.debug(f"Resource {uri} of server [{name}] updated, {dropped} cached tool results dropped")
+
+    async def refresh_server_catalog(self, name: str) -> None:
+        while self._stale_catalog_kinds.get(name):
+            kinds = self._stale_catalog_kinds.pop(name)
+            try:
+                server_catalog = await discover_server(
+                    self.servers[name], self.initialize_results[name].capabilities, kinds, base=self.catalog.servers.get(name))
+            except Exception as e:
+                log.error(f"Failed to refresh catalog of server {name}: {e}")
+                return
+
+            self.update_catalog(name, server_catalog)
+            log.info(f"Catalog of server [{name}] refreshed: {', '.join(sorted(kinds))}")
+
+    async def call_tool(self, registered_tool: RegisteredTool, tool_call: ToolCall, spill_store: SpillStore) -> CallToolResultWithID:
+        """Call a tool a conversation offers, through the result cache, large results are spilled to `spill_store`."""
+        name = tool_call.name
+        if name == READ_SPILLED_TOOL:
+            read_res = self.read_spilled(spill_store, tool_call.arguments)
+            return CallToolResultWithID(
+                tool_call_id=tool_call.id,
+                name=name,
+                content=read_res.content,
+                isError=read_res.isError
+            )
+
+        server = self.servers.get(registered_tool.server_name, None)
+        if not server:
+            log.warning(f"Server not found: {registered_tool.server_name}")
+            return CallToolResultWithID(
+                tool_call_id=tool_call.id,
+                name=name,
+                content=[types.TextContent(type="text", text=f"Server not found: {registered_tool.server_name}")],
+                isError=True
+            )
+
+        cacheable = self.result_cache.cacheable(registered_tool.tool)
+        tool_call_res: types.CallToolResult | None = self.result_cache.get(name, tool_call.arguments) if cacheable else None
+        if tool_call_res is not None:
+            log.info(f":🔧:Result of tool [{registered_tool.tool_name}] served from cache")
+        else:
+            tool_call_res = await server.execute_tool(
+                tool=registered_tool.tool,
+                arguments=tool_call.arguments
+            )
+            if cacheable:
+                self.result_cache.put(name, tool_call.arguments, tool_call_res)
+
+        if tool_call_res.isError:
+            log.warning(
+                f"Error executing tool: {registered_tool.tool_name}, error is: {tool_call_res.content}")
+
+        content = spill_store.spill(name, tool_call_res.content)
+        if spill_store.has_spilled and HOST_SERVER_NAME not in self.catalog:
+            # Offer the tool to read spilled results from the first one on
+            self.catalog.update(HOST_SERVER_NAME, ServerCatalog(tools=[read_spilled_tool()]))
+
+        return CallToolResultWithID(
+            tool_call_id=tool_call.id,
+            name=name,
+            content=content,
+            isError=tool_call_res.isError
+        )
+
+    def read_spilled(self, spill_store: SpillStore, arguments: dict[str, any]) -> types.CallToolResult:
+        try:
+            return spill_store.read(
+                handle=str(arguments.get("handle", "")),
+                offset=int(arguments.get("offset", 0)),
+                length=int(arguments.get("length", DEFAULT_READ_LENGTH)),
+            )
+        except (TypeError, ValueError) as e:
+            return types.CallToolResult(
+                content=[types.TextContent(type="text", text=f"Invalid arguments: {e}")],
+                isError=True,
+            )
+
+    async def cleanup_servers(self) -> None:
+        """Clean up all servers properly."""
+        background_tasks = [*self.startup_tasks.values(), *self._refresh_tasks.values()]
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+
+        # cleanup must follow the FIFO: https://github.com/modelcontextprotocol/python-sdk/issues/577
+        for name, server in reversed(list(self.servers.items())):
+            log.info(f"Shutting down MCP server: [{name}]")
+            await server.cleanup()
@@ -1,22 +1,28 @@
 from mcp import ClientSession, StdioServerParameters, types
 from mcp.shared.exceptions import McpError
-from mcp_cli_host.cmd.stdio_client import stdio_client
+from mcp_cli_host.cmd.stdio_client import stdio_client, DEFAULT_MAX_MESSAGE_SIZE, StreamBufferSizes, TransportStats
 from mcp.client.streamable_http import streamablehttp_client
-from mcp_cli_host.cmd.mcp_client_functions.err_monitor import err_monitor
+from mcp_cli_host.cmd.mcp_client_functions.err_monitor import StderrCapture, err_monitor
+from mcp_cli_host.cmd.resource_cache import ResourceCache
 from mcp_cli_host.cmd.mcp_client_functions.sampling_handler import SamplingCallback
-from mcp_cli_host.cmd.mcp_client_functions.notification_handler import NotificationHandler
+from mcp_cli_host.cmd.mcp_client_functions.notification_handler import NotificationHandler, ListKind
 from mcp_cli_host.cmd.mcp_client_functions.roots_handler import RootsCallback
 from mcp_cli_host.cmd.mcp_client_functions.elicitation_handler import ElicitationCallback
 import os
 import json
-from contextlib import AsyncExitStack
+from anyio.abc import ObjectReceiveStream
+from contextlib import AsyncExitStack, asynccontextmanager, nullcontext
 import asyncio
 import shutil
+from fnmatch import fnmatchcase
 import logging
+import random
+import time
+from typing import Awaitable, Callable, Literal
 from mcp_cli_host.llm.base_provider import Provider
 from rich.console import Console
-from pydantic import AnyUrl, BaseModel, AnyHttpUrl
-from mcp_cli_host.cmd.utils import COMMON_SEPERATOR, PREFIX_RESOURCE_TOOL, URL_TEMPLATE_KEY
+from pydantic import AnyUrl, BaseModel, AnyHttpUrl, ConfigDict, Field
+from mcp_cli_host.cmd.utils import COMMON_SEPERATOR, PREFIX_RESOURCE_TOOL, ResourceTemplateIndex
 from datetime import timedelta
 import readline  # noqa
 
@@ -25,6 +31,92 @@ console = Console()
 
 log = logging.getLogger("mcp_cli_host")
 
+ServerStatus = Literal["pending", "connecting", "ready", "degraded", "reconnecting", "failed", "idle", "stopped"]
+
+# Seconds a health check ping may take before the connection is considered lost
+HEALTH_CHECK_TIMEOUT = 10.0
+# First delay between reconnect attempts, doubled with every failed attempt up to `maxReconnectDelay`
+RECONNECT_BASE_DELAY = 1.0
+
+class ServerOptions(BaseModel):
+    """Host side options of an entry in `mcpServers`, next to its transport parameters."""
+    model_config = ConfigDict(populate_by_name=True)
+
+    max_concurrency: int | None = Field(default=None, alias="maxConcurrency", gt=0)
+    """(Optional) Maximum number of tool calls in flight on the server, unlimited if not set."""
+
+    lazy: bool = False
+    """(Optional) Spawn the server on first use instead of at startup, its catalog comes from the snapshot of an earlier run."""
+
+    idle_timeout: float = Field(default=300.0, alias="idleTimeout", gt=0)
+    """(Optional) Seconds without requests after which a lazy server is shut down again, until it is used next."""
+
+    max_message_size: int = Field(default=DEFAULT_MAX_MESSAGE_SIZE, alias="maxMessageSize", gt=0)
+    """(Optional) Largest message in bytes accepted from a local server, longer ones are dropped."""
+
+    buffer_sizes: StreamBufferSizes = Field(default_factory=StreamBufferSizes, alias="bufferSizes")
+    """(Optional) Messages buffered by the stdout, stdin and stderr streams of a local server."""
+
+    stderr_lines: int = Field(default=1000, alias="stderrLines", ge=0)
+    """(Optional) Latest stderr lines of a local server kept in memory, shown by `/stderr`."""
+
+    stderr_echo_rate: float = Field(default=20.0, alias="stderrEchoRate", ge=0)
+    """(Optional) Stderr lines per second echoed to the debug log, the ones beyond are counted as suppressed."""
+
+    stderr_log: str | None = Field(default=None, alias="stderrLog")
+    """(Optional) File the stderr of a local server is written to, rotated at 10 MiB."""
+
+    resource_cache_ttl: float = Field(default=30.0, alias="resourceCacheTtl", ge=0)
+    """(Optional) Seconds read resources are cached when the server doesn't support subscriptions, 0 disables the cache."""
+
+    resource_cache_max_entries: int = Field(default=256, alias="resourceCacheMaxEntries", gt=0)
+    """(Optional) Resources cached at most, the least recently read ones are evicted beyond."""
+
+    replicas: int = Field(default=1, ge=1)
+    """(Optional) Identical processes spawned for a local server, tool calls are spread across them."""
+
+    dispatch: Literal["least-loaded", "round-robin"] = "least-loaded"
+    """(Optional) How tool calls are spread across the replicas: to the one with the fewest calls in flight, or in turn."""
+
+    health_check_interval: float = Field(default=30.0, alias="healthCheckInterval", ge=0)
+    """(Optional) Seconds between pings of a connected server while it is idle, 0 disables them."""
+
+    reconnect_timeout: float = Field(default=60.0, alias="reconnectTimeout", ge=0)
+    """(Optional) Seconds requests wait for a server which lost its connection to be reconnected."""
+
+    max_reconnect_delay: float = Field(default=60.0, alias="maxReconnectDelay", gt=0)
+    """(Optional) Longest delay in seconds between two reconnect attempts."""
+
+class ToolFilter(BaseModel):
+    """Glob patterns on qualified tool names (`server--tool`) deciding which tools are offered to the LLM."""
+
+    allow: list[str] = Field(default_factory=list)
+    """(Optional) Only tools matching one of these patterns are offered, all tools if empty."""
+
+    deny: list[str] = Field(default_factory=list)
+    """(Optional) Tools matching one of these patterns are never offered, it wins over `allow`."""
+
+    def permits(self, name: str) -> bool:
+        if any(fnmatchcase(name, pattern) for pattern in self.deny):
+            return False
+        return not self.allow or any(fnmatchcase(name, pattern) for pattern in self.allow)
+
+class ToolCacheOptions(BaseModel):
+    """The `toolCache` section of the configuration file, caching the results of tools which are safe to repeat."""
+    model_config = ConfigDict(populate_by_name=True)
+
+    enabled: bool = False
+    """(Optional) Whether results are cached, true when the section is given."""
+
+    ttl: float = Field(default=300.0, gt=0)
+    """(Optional) Seconds a cached result stays valid."""
+
+    max_entries: int = Field(default=256, alias="maxEntries", gt=0)
+    """(Optional) Number of results kept, the least recently used one is evicted beyond it."""
+
+    allow: list[str] = Field(default_factory=list)
+    """(Optional) Glob patterns on qualified tool names cached even without a `readOnlyHint`."""
+
 class RemoteServerParameters(BaseModel):
     url: str | AnyHttpUrl | None = None,
     """The URL where the MCP server is accessible."""
@@ -32,65 +124,447 @@ class RemoteServerParameters(BaseModel):
     headers: dict[str, str] | None = None
     """ (Optional) Array of HTTP headers for authentication and custom headers"""
 
+class _WatchedReceiveStream(ObjectReceiveStream):
+    """Receive stream of a transport which tells when the session has stopped reading it.
+
+    The session closes it once its receive loop is over, after failing the requests still waiting for a response,
+    so a transport which ended is noticed without leaving callers hanging.
+    """
+
+    def __init__(self, stream: ObjectReceiveStream, on_close: Callable[[], None]) -> None:
+        self._stream = stream
+        self._on_close = on_close
+
+    async def receive(self):
+        return await self._stream.receive()
+
+    async def aclose(self) -> None:
+        await self._stream.aclose()
+        self._on_close()
+
+
 class Server:
-    """Manages MCP server connections and tool execution."""
+    """Manages MCP server connections and tool execution.
+
+    A local server with `replicas` > 1 runs as a pool of identical processes. The server itself is the first one,
+    it serves the catalog, resources, prompts and notifications, while tool calls are spread across all of them.
 
-    def __init__(self, name: str, config: StdioServerParameters | RemoteServerParameters) -> None:
+    Once connected, a server is supervised: it is pinged while idle, and when its process exits, its transport
+    fails or a ping goes unanswered, it is connected again with jittered exponential backoff. Requests meanwhile
+    wait up to `reconnectTimeout` seconds for it.
+    """
+
+    def __init__(self, name: str, config: StdioServerParameters | RemoteServerParameters, options: ServerOptions | None = None) -> None:
         self.name: str = name
         self.config: StdioServerParameters | RemoteServerParameters = config
+        self.options: ServerOptions = options or ServerOptions()
+        self._call_limiter: asyncio.Semaphore | None = asyncio.Semaphore(self.options.max_concurrency) if self.options.max_concurrency else None
         self.session: ClientSession | None = None
+        self.status: ServerStatus = "pending"
+        self.init_time: float | None = None
+        # Backpressure metrics of the streams to a local server, of the latest connection
+        self.transport_stats: TransportStats | None = None
+        self.stderr: StderrCapture = StderrCapture(name, self.options.stderr_lines, self.options.stderr_echo_rate, self.options.stderr_log)
+        # How long requests wait for a server which is still connecting
+        self.ready_timeout: float = 30.0
+        self._ready: asyncio.Event = asyncio.Event()
         self._cleanup_lock: asyncio.Lock = asyncio.Lock()
-        self.exit_stack: AsyncExitStack = AsyncExitStack()
+        self._session_task: asyncio.Task | None = None
+        self._shutdown: asyncio.Event = asyncio.Event()
+        # Receives (server name, kind) when the server announces a changed tools/resources/prompts list
+        self.on_list_changed: Callable[[str, ListKind], None] | None = None
+        # Receives (server name, uri) when the server announces an update of a subscribed resource
+        self.on_resource_updated: Callable[[str, str], None] | None = None
+        self.resource_cache: ResourceCache = ResourceCache(self.options.resource_cache_ttl, self.options.resource_cache_max_entries)
+        # Parsed URI templates of the tools generated from the server's resource templates
+        self.resource_templates: ResourceTemplateIndex = ResourceTemplateIndex()
+        # Resources subscribed to in the current session, when the server supports it
+        self._can_subscribe: bool = False
+        self._subscribed: set[str] = set()
+        # Arguments of `initialize`, kept to spawn a lazy server on demand
+        self._initialize_args: tuple[bool, Provider, list[str]] = (False, None, None)
+        # Held while a lazy server is spawned, and while it is shut down for being idle
+        self._spawn_lock: asyncio.Lock = asyncio.Lock()
+        # Whether requests of the server, sampling and elicitation, may ask the user on the terminal
+        self.interactive: bool = True
+        self._idle_task: asyncio.Task | None = None
+        self._in_flight: int = 0
+        self._last_used: float = time.monotonic()
+        # The other processes of the pool, created on first initialize, and the tasks keeping them connected
+        self.replicas: list[Server] = []
+        self._replica_tasks: list[asyncio.Task] = []
+        # Tool calls in flight on this process, to dispatch to the least loaded one
+        self.tool_calls: int = 0
+        self._dispatched: int = 0
+        # Reconnects the server when its connection is lost, from the first successful initialize until cleanup
+        self._supervisor_task: asyncio.Task | None = None
+        self._supervised: bool = False
+        # Failed connects and connections lost before they were stable, the backoff grows with them
+        self._reconnect_attempts: int = 0
+        self._connected_at: float = 0.0
+        # Receives (server name, initialize result) when the server is connected again after losing its connection
+        self.on_reconnected: Callable[[str, types.InitializeResult], None] | None = None
+        # Receives (server name, initialize result) when a lazy server is spawned on use
+        self.on_spawned: Callable[[str, types.InitializeResult], None] | None = None
+        self.reconnects: int = 0
+
+    def configure(self, debug_model: bool = False, provider: Provider = None, roots: list[str] = None) -> None:
+        """Set the arguments a lazy server is initialized with when it is first used."""
+        self._initialize_args = (debug_model, provider, roots)
 
     async def initialize(self, debug_model: bool = False, provider: Provider = None, roots: list[str] = None) -> types.InitializeResult | None:
-        """Initialize the server connection."""
+        """Initialize the server connection.
+
+        The transport and the session are owned by a dedicated task which keeps them open until `cleanup`,
+        anyio requires its cancel scopes to be entered and exited by the same task, so this is what allows
+        several servers to be initialized concurrently and torn down from anywhere.
+
+        Returns:
+            The initialize result of the server.
+
+        Raises:
+            Exception: If the connection or the handshake fails, the server is cleaned up before.
+        """
+        self.configure(debug_model, provider, roots)
+        if self.options.replicas > 1 and not self.replicas:
+            self.replicas = self._create_replicas()
+
         try:
-            if isinstance(self.config, RemoteServerParameters):
-                # For remote server, we use the streamablehttp_client to create a connection
-                log.info(f"Connecting to remote server {self.name} at {self.config.url}")
-                remote_transport = await self.exit_stack.enter_async_context(
-                    streamablehttp_client(self.config.url, 
-                                          headers=self.config.headers,
-                                          timeout=timedelta(seconds=60),)
-                )
-                read, write, get_session_id = remote_transport
+            initialize_result = await self._connect()
+        except BaseException:
+            await self.cleanup()
+            raise
+
+        # Before any task runs: a connection lost right away is to be reconnected, not failed
+        self._supervised = True
+        self._supervisor_task = asyncio.create_task(self._supervise(), name=f"mcp-server-supervisor-{self.name}")
+        self._replica_tasks = [
+            asyncio.create_task(self._keep_replica(replica), name=f"mcp-server-{replica.name}")
+            for replica in self.replicas
+        ]
+        return initialize_result
+
+    async def _connect(self, status: ServerStatus = "connecting") -> types.InitializeResult:
+        """Start the task owning the transport and the session, and wait for the handshake.
+
+        Raises:
+            Exception: If the connection or the handshake fails, the session task is stopped before.
+        """
+        debug_model, provider, roots = self._initialize_args
+        ready: asyncio.Future[types.InitializeResult] = asyncio.get_running_loop().create_future()
+        started = time.perf_counter()
+        self.status = status
+        self._shutdown = asyncio.Event()
+        self._session_task = asyncio.create_task(
+            self._run_session(ready, debug_model, provider, roots), name=f"mcp-server-{self.name}")
+
+        try:
+            initialize_result = await ready
+        except BaseException as e:
+            if not isinstance(e, asyncio.CancelledError):
+                log.error(f"Error initializing server {self.name}: {e}")
+            await self._close_session()
+            raise
+
+        self.init_time = time.perf_counter() - started
+        self._connected_at = time.monotonic()
+        self.status = "ready"
+        self._ready.set()
+        if self.options.lazy:
+            self._last_used = time.monotonic()
+            self._idle_task = asyncio.create_task(self._watch_idle(), name=f"mcp-server-idle-{self.name}")
+        return initialize_result
+
+    async def _supervise(self) -> None:
+        """Connect the server again whenever its connection is lost, until it is cleaned up.
+
+        The backoff is only reset once a connection stayed up for a `healthCheckInterval`, so that a server
+        which keeps failing right after its handshake isn't respawned in a tight loop.
+        """
+        while True:
+            await asyncio.wait([self._session_task])
+            if self.status != "reconnecting":
+                # Cleaned up, or stopped for being idle
+                return
+
+            stable_after = self.options.health_check_interval or self.options.max_reconnect_delay
+            if time.monotonic() - self._connected_at >= stable_after:
+                self._reconnect_attempts = 0
             else:
-                # For local server, we use the stdio_client to create a connection
-                log.info(f"Connecting to local server {self.name}")
-                stdio_transport = await self.exit_stack.enter_async_context(
-                    stdio_client(self.config)
-                )
-                read, write, err = stdio_transport
+                self._reconnect_attempts += 1
+                delay = self._reconnect_delay()
+                log.warning(f"Server {self.name} was lost soon after connecting. Attempt {self._reconnect_attempts}, reconnecting in {delay:.1f} seconds...")
+                await asyncio.sleep(delay)
 
-                _ = await self.exit_stack.enter_async_context(
-                    err_monitor(err)
-                )
+            initialize_result = await self._reconnect()
+            self.reconnects += 1
+            log.info(f"Server reconnected: [{self.name}] in {self.init_time:.2f}s")
+            if self.on_reconnected:
+                self.on_reconnected(self.name, initialize_result)
 
-            session = await self.exit_stack.enter_async_context(
-                ClientSession(read,
-                              write,
-                              message_handler=NotificationHandler(),
-                              sampling_callback=SamplingCallback(provider),
-                              list_roots_callback=RootsCallback(roots) if roots else None,
-                              elicitation_callback=ElicitationCallback()
-                            )
-            )
+    async def _reconnect(self, status: ServerStatus = "reconnecting") -> types.InitializeResult:
+        """Connect until it succeeds, with exponential backoff and jitter, so a pool doesn't reconnect in lockstep.
 
-            initialize_result: types.InitializeResult = await session.initialize()
+        The attempts add up with those of the previous reconnects, until a connection is stable.
+        """
+        while True:
+            try:
+                return await self._connect(status)
+            except Exception as e:
+                self._reconnect_attempts += 1
+                delay = self._reconnect_delay()
+                self.status = status
+                log.warning(f"Failed to connect server {self.name}: {e}. Attempt {self._reconnect_attempts}, retrying in {delay:.1f} seconds...")
+                await asyncio.sleep(delay)
+
+    def _reconnect_delay(self) -> float:
+        # The exponent is capped, a server down for long keeps counting attempts and the power would overflow a float
+        backoff = min(RECONNECT_BASE_DELAY * 2 ** min(self._reconnect_attempts - 1, 32), self.options.max_reconnect_delay)
+        return random.uniform(backoff / 2, backoff)
+
+    def _create_replicas(self) -> list["Server"]:
+        if isinstance(self.config, RemoteServerParameters):
+            log.warning(f"Server {self.name} is remote, replicas are only spawned for local servers")
+            return []
+
+        # The pool as a whole is lazy and limited in concurrency, not each process of it
+        options = self.options.model_copy(update={"replicas": 1, "lazy": False, "max_concurrency": None, "stderr_log": None})
+        replicas: list[Server] = []
+        for number in range(2, self.options.replicas + 1):
+            replica = Server(f"{self.name}#{number}", self.config, options)
+            replica.interactive = self.interactive
+            replica.ready_timeout = self.ready_timeout
+            if self.stderr.log_path:
+                root, ext = os.path.splitext(self.stderr.log_path)
+                replica.stderr.log_path = f"{root}.{number}{ext}"
+            replicas.append(replica)
+        return replicas
+
+    async def _keep_replica(self, replica: "Server") -> None:
+        """Connect a replica and supervise it like the server itself, until the server is cleaned up.
+
+        A replica which dies is spawned again with the backoff of the server's reconnects, which only resets
+        once the replica stayed up for a `healthCheckInterval`.
+        """
+        replica._supervised = True
+        replica.configure(*self._initialize_args)
+        await replica._reconnect(status="connecting")
+        log.info(f"Replica connected: [{replica.name}] in {replica.init_time:.2f}s")
+        await replica._supervise()
+
+    def _pick_process(self) -> "Server":
+        """The process of the pool the next tool call goes to, among the connected ones."""
+        processes = [process for process in (self, *self.replicas) if process.session]
+        if not processes:
+            raise RuntimeError(f"Server {self.name} not initialized")
+        if len(processes) == 1:
+            return processes[0]
 
-            if debug_model and initialize_result.capabilities.logging:
-                try:
-                    await session.set_logging_level("debug")
-                except McpError as e:
-                    log.warning(f"Failed to set logging level to debug: {e}")
+        # Rotate the start, so that ties of the least loaded dispatch are spread as well
+        start = self._dispatched % len(processes)
+        self._dispatched += 1
+        processes = processes[start:] + processes[:start]
+        if self.options.dispatch == "round-robin":
+            return processes[0]
+        return min(processes, key=lambda process: process.tool_calls)
 
-            self.session = session
-            return initialize_result
-        except Exception as e:
-            print(type(e))
-            log.error(f"Error initializing server {self.name}: {e}")
-            await self.cleanup()
+    async def ensure_session(self) -> ClientSession:
+        """Return the session, waiting up to `ready_timeout` seconds while the server is yet to connect,
+        up to `reconnectTimeout` seconds while it is reconnecting.
+
+        A lazy server which is not running is spawned here.
+
+        Raises:
+            RuntimeError: If the server is not initialized in time.
+        """
+        # An idle server may still have the session it is shutting down
+        if self.options.lazy and self.status in ("pending", "idle"):
+            await self._spawn()
+
+        if not self.session and self.status in ("pending", "connecting", "degraded", "reconnecting"):
+            timeout = self.options.reconnect_timeout if self.status == "reconnecting" else self.ready_timeout
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        if not self.session:
+            raise RuntimeError(f"Server {self.name} not initialized")
+        return self.session
+
+    async def _spawn(self) -> None:
+        async with self._spawn_lock:
+            # Concurrent calls wait for the first one to spawn the server, or for the idle shutdown to finish
+            if self.session or self.status not in ("pending", "idle"):
+                return
+
+            log.info(f"Spawning lazy server {self.name} on first use")
+            try:
+                initialize_result = await self.initialize(*self._initialize_args)
+            except Exception as e:
+                self.status = "idle"
+                raise RuntimeError(f"Failed to spawn server {self.name}: {e}") from e
+
+            if self.on_spawned:
+                self.on_spawned(self.name, initialize_result)
+
+    @asynccontextmanager
+    async def _in_use(self):
+        """Mark a request in flight, a lazy server is never shut down for being idle under it."""
+        self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._last_used = time.monotonic()
+
+    async def _watch_idle(self) -> None:
+        idle_timeout = self.options.idle_timeout
+        while self.session:
+            idle_for = time.monotonic() - self._last_used
+            if self._in_flight == 0 and idle_for >= idle_timeout:
+                log.info(f"Server {self.name} idle for {idle_for:.0f}s, shutting it down until next use")
+                async with self._spawn_lock:
+                    # Set first, a request coming in meanwhile spawns the server again once it is shut down
+                    self.status = "idle"
+                    await self.cleanup()
+                return
+            await asyncio.sleep(max(idle_timeout - idle_for, 1.0))
+
+    async def _run_session(self, ready: asyncio.Future, debug_model: bool, provider: Provider, roots: list[str]) -> None:
+        # The transport ends when a local server exits or a remote one drops the connection
+        shutdown = self._shutdown
+        lost = asyncio.Event()
+
+        def closed() -> None:
+            if not shutdown.is_set():
+                lost.set()
+                shutdown.set()
+
+        try:
+            async with AsyncExitStack() as exit_stack:
+                if isinstance(self.config, RemoteServerParameters):
+                    # For remote server, we use the streamablehttp_client to create a connection
+                    log.info(f"Connecting to remote server {self.name} at {self.config.url}")
+                    remote_transport = await exit_stack.enter_async_context(
+                        streamablehttp_client(self.config.url, 
+                                              headers=self.config.headers,
+                                              timeout=timedelta(seconds=60),)
+                    )
+                    read, write, get_session_id = remote_transport
+                else:
+                    # For local server, we use the stdio_client to create a connection
+                    log.info(f"Connecting to local server {self.name}")
+                    self.transport_stats = TransportStats(self.options.buffer_sizes)
+                    stdio_transport = await exit_stack.enter_async_context(
+                        stdio_client(self.config, max_message_size=self.options.max_message_size, stats=self.transport_stats)
+                    )
+                    read, write, err = stdio_transport
+
+                    _ = await exit_stack.enter_async_context(
+                        err_monitor(err, self.stderr)
+                    )
+
+                read = _WatchedReceiveStream(read, closed)
+
+                session = await exit_stack.enter_async_context(
+                    ClientSession(read,
+                                  write,
+                                  message_handler=NotificationHandler(on_list_changed=self._list_changed, on_resource_updated=self._resource_updated),
+                                  sampling_callback=SamplingCallback(provider, self.interactive),
+                                  list_roots_callback=RootsCallback(roots) if roots else None,
+                                  elicitation_callback=ElicitationCallback(self.interactive)
+                                )
+                )
+
+                initialize_result: types.InitializeResult = await session.initialize()
+
+                if debug_model and initialize_result.capabilities.logging:
+                    try:
+                        await session.set_logging_level("debug")
+                    except McpError as e:
+                        log.warning(f"Failed to set logging level to debug: {e}")
+
+                resources_capability = initialize_result.capabilities.resources
+                self._can_subscribe = bool(resources_capability and resources_capability.subscribe)
+                self.session = session
+                ready.set_result(initialize_result)
+
+                # Hold the transport open until cleanup
+                await self._check_health(session, shutdown, closed)
+
+            if lost.is_set():
+                self._ready.clear()
+                self.status = "reconnecting" if self._supervised else "failed"
+                log.error(f"Server {self.name} lost its connection" + (", reconnecting" if self._supervised else ""))
+        except asyncio.CancelledError:
+            if not ready.done():
+                ready.cancel()
             raise
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                log.error(f"Session of server {self.name} closed with error: {e}")
+        finally:
+            self.session = None
+            # Subscriptions end with the session, cached contents wouldn't learn about updates anymore
+            self._subscribed.clear()
+            self.resource_cache.clear()
+
+    async def _check_health(self, session: ClientSession, shutdown: asyncio.Event, lost: Callable[[], None]) -> None:
+        """Ping the server every `healthCheckInterval` seconds it is idle until shutdown, a failed ping calls `lost`.
+
+        A busy server is not pinged, its requests tell about the connection already.
+        """
+        interval = self.options.health_check_interval
+        while not shutdown.is_set():
+            try:
+                await asyncio.wait_for(shutdown.wait(), timeout=interval or None)
+                return
+            except asyncio.TimeoutError:
+                pass
+
+            if self._in_flight or self.tool_calls or time.monotonic() - self._last_used < interval:
+                continue
+            try:
+                await asyncio.wait_for(session.send_ping(), timeout=HEALTH_CHECK_TIMEOUT)
+            except Exception as e:
+                log.warning(f"Server {self.name} failed its health check: {str(e) or type(e).__name__}")
+                lost()
+                return
+
+    def _list_changed(self, kind: ListKind) -> None:
+        if self.on_list_changed:
+            self.on_list_changed(self.name, kind)
+
+    def _resource_updated(self, uri: str) -> None:
+        self.resource_cache.updated(uri)
+        if self.on_resource_updated:
+            self.on_resource_updated(self.name, uri)
+
+    async def _list_all(self, list_method: Callable[[str | None], Awaitable[types.PaginatedResult]], field: str) -> list[any]:
+        """Call a paginated list method until the server returns no `nextCursor`.
+
+        Args:
+            list_method: session method taking the cursor, e.g. `session.list_tools`.
+            field: name of the items field in the result, e.g. `tools`.
+
+        Returns:
+            The items of all pages.
+        """
+        items: list[any] = []
+        cursor: str | None = None
+        seen_cursors: set[str] = set()
+        while True:
+            result = await list_method(cursor)
+            items.extend(getattr(result, field))
+
+            cursor = result.nextCursor
+            # Stop on a repeated cursor as well, a buggy server should not keep us looping
+            if not cursor or cursor in seen_cursors:
+                return items
+            seen_cursors.add(cursor)
 
     async def list_tools(self) -> list[types.Tool]:
         """List available tools from the server.
@@ -104,15 +578,15 @@ class Server:
         if not self.session:
             raise RuntimeError(f"Server {self.name} not initialized")
 
-        tools_response: types.ListToolsResult = await self.session.list_tools()
         tools: list[types.Tool] = []
 
-        for tool in tools_response.tools:
+        for tool in await self._list_all(self.session.list_tools, "tools"):
             tools.append(
                 types.Tool(
                     name=f"{self.name}{COMMON_SEPERATOR}{tool.name}",
                     description=tool.description,
-                    inputSchema=tool.inputSchema)
+                    inputSchema=tool.inputSchema,
+                    annotations=tool.annotations)
             )
 
         return tools
@@ -126,6 +600,9 @@ class Server:
     ) -> types.CallToolResult:
         """Execute a tool with retry mechanism.
 
+        When `maxConcurrency` is configured for the server, calls beyond the limit wait for a free slot.
+        With replicas, each attempt goes to the connected process picked by the `dispatch` option.
+
         Args:
             tool_name: Name of the tool to execute.
             arguments: Tool arguments.
@@ -139,18 +616,27 @@ class Server:
             RuntimeError: If server is not initialized.
             Exception: If tool execution fails after all retries.
         """
-        if not self.session:
-            raise RuntimeError(f"Server {self.name} not initialized")
-        
+        async with self._in_use():
+            if not any(replica.session for replica in self.replicas):
+                # The replicas can take calls while the server itself is reconnecting
+                await self.ensure_session()
+
+            async with self._call_limiter or nullcontext():
+                return await self._execute_tool(tool, arguments, retries, delay)
+
+    async def _execute_tool(
+        self,
+        tool: types.Tool,
+        arguments: dict[str, any],
+        retries: int,
+        delay: float,
+    ) -> types.CallToolResult:
         tool_name: str = tool.name.split(COMMON_SEPERATOR)[1]
         # handle the tools generated by resource template
         if tool_name.startswith(PREFIX_RESOURCE_TOOL):
-            # Extract the resource URI from the tool name
-            resource_uri = tool.meta.get(URL_TEMPLATE_KEY, None)
-            resource_uri = resource_uri.format(**arguments)
-            log.info(f"Executing resource tool: {resource_uri}")
-
             try:
+                resource_uri = self.resource_templates.expand(tool, arguments)
+                log.info(f"Executing resource tool: {resource_uri}")
                 # Read the resource
                 read_result: types.ReadResourceResult = await self.get_resource(
                     uri=resource_uri, retries=retries, delay=delay
@@ -172,8 +658,16 @@ class Server:
         attempt = 0
         while attempt < retries:
             try:
-                log.info(f":🔧:Executing tool: [{tool_name}]...")
-                result: types.CallToolResult = await self.session.call_tool(tool_name, arguments)
+                if not self.session and not any(replica.session for replica in self.replicas):
+                    # Lost meanwhile, wait for the reconnect
+                    await self.ensure_session()
+                process = self._pick_process()
+                log.info(f":🔧:Executing tool: [{tool_name}]" + (f" on {process.name}" if self.replicas else "") + "...")
+                process.tool_calls += 1
+                try:
+                    result: types.CallToolResult = await process.session.call_tool(tool_name, arguments)
+                finally:
+                    process.tool_calls -= 1
 
                 return result
 
@@ -201,10 +695,9 @@ class Server:
         if not self.session:
             raise RuntimeError(f"Server {self.name} not initialized")
 
-        resources_response: types.ListResourcesResult = await self.session.list_resources()
         resources: list[types.Resource] = []
 
-        for resource in resources_response.resources:
+        for resource in await self._list_all(self.session.list_resources, "resources"):
             resources.append(
                 types.Resource(
                     name=f"{self.name}{COMMON_SEPERATOR}{resource.name}",
@@ -228,10 +721,9 @@ class Server:
         if not self.session:
             raise RuntimeError(f"Server {self.name} not initialized")
 
-        resource_templates_response: types.ListResourceTemplatesResult = await self.session.list_resource_templates()
         resource_templates: list[types.ResourceTemplate] = []
 
-        for resource_template in resource_templates_response.resourceTemplates:
+        for resource_template in await self._list_all(self.session.list_resource_templates, "resourceTemplates"):
             resource_templates.append(
                 types.ResourceTemplate(
                     name=f"{self.name}{COMMON_SEPERATOR}{resource_template.name}",
@@ -262,14 +754,50 @@ class Server:
             RuntimeError: If server is not initialized.
             Exception: If tool execution fails after all retries.
         """
-        if not self.session:
-            raise RuntimeError(f"Server {self.name} not initialized")
+        async with self._in_use():
+            await self.ensure_session()
+            return await self._get_resource(uri, retries, delay)
+
+    async def _get_resource(self, uri: str, retries: int, delay: float) -> types.ReadResourceResult:
+        uri = str(AnyUrl(uri))
+        if not self.resource_cache.enabled:
+            return await self._read_resource(uri, retries, delay)
+
+        cached = self.resource_cache.get(uri)
+        if cached is not None:
+            log.info(f":📖:read resource: [{uri}] from cache")
+            return cached
+
+        # Taken before the subscription, an update announced from then on makes the result stale
+        generation = self.resource_cache.generation(uri)
+        subscribed = await self._subscribe(uri)
+        result = await self._read_resource(uri, retries, delay)
+        self.resource_cache.put(uri, result, subscribed=subscribed, generation=generation)
+        return result
+
+    async def _subscribe(self, uri: str) -> bool:
+        """Subscribe to updates of a resource when the server supports it, tell whether it is subscribed."""
+        if not self._can_subscribe:
+            return False
+        if uri in self._subscribed:
+            return True
+
+        try:
+            await self.session.subscribe_resource(AnyUrl(uri))
+        except Exception as e:
+            log.warning(f"Failed to subscribe to resource {uri}, cache it for {self.resource_cache.ttl}s instead: {e}")
+            return False
 
+        self._subscribed.add(uri)
+        return True
+
+    async def _read_resource(self, uri: str, retries: int, delay: float) -> types.ReadResourceResult:
         attempt = 0
         while attempt < retries:
             try:
                 log.info(f":📖:read resource: [{uri}]...")
-                result: types.ReadResourceRequest = await self.session.read_resource(AnyUrl(uri))
+                session = await self.ensure_session()
+                result: types.ReadResourceRequest = await session.read_resource(AnyUrl(uri))
 
                 return result
 
@@ -297,10 +825,9 @@ class Server:
         if not self.session:
             raise RuntimeError(f"Server {self.name} not initialized")
 
-        prompts_response: types.ListPromptsResult = await self.session.list_prompts()
         prompts: list[types.Prompt] = []
 
-        for prompt in prompts_response.prompts:
+        for prompt in await self._list_all(self.session.list_prompts, "prompts"):
             prompts.append(
                 types.Prompt(
                     name=f"{self.name}{COMMON_SEPERATOR}{prompt.name}",
@@ -333,14 +860,17 @@ class Server:
             RuntimeError: If server is not initialized.
             Exception: If tool execution fails after all retries.
         """
-        if not self.session:
-            raise RuntimeError(f"Server {self.name} not initialized")
+        async with self._in_use():
+            await self.ensure_session()
+            return await self._get_prompt(name, arguments, retries, delay)
 
+    async def _get_prompt(self, name: str, arguments: dict[str, str], retries: int, delay: float) -> types.GetPromptResult:
         attempt = 0
         while attempt < retries:
             try:
                 log.info(f":📄:read prompt: [{name}]...")
-                result: types.GetPromptResult = await self.session.get_prompt(name, arguments)
+                session = await self.ensure_session()
+                result: types.GetPromptResult = await session.get_prompt(name, arguments)
 
                 return result
 
@@ -357,23 +887,57 @@ class Server:
                     raise
     
     async def cleanup(self) -> None:
-        """Clean up server resources."""
+        """Clean up server resources, the replicas included."""
+        self._supervised = False
+        self._reconnect_attempts = 0
+        idle_task, self._idle_task = self._idle_task, None
+        if idle_task and idle_task is not asyncio.current_task():
+            idle_task.cancel()
+
+        background_tasks = [task for task in (self._supervisor_task, *self._replica_tasks) if task]
+        self._supervisor_task, self._replica_tasks = None, []
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        for replica in self.replicas:
+            await replica.cleanup()
+
+        await self._close_session()
+
+    async def _close_session(self) -> None:
         async with self._cleanup_lock:
+            session_task, self._session_task = self._session_task, None
+            if session_task is None:
+                return
+
+            self._ready.clear()
+            self._shutdown.set()
+            if self.session is None:
+                # Still connecting, nothing to shut down gracefully
+                session_task.cancel()
+
             try:
-                await self.exit_stack.aclose()
-                
+                await session_task
+            except asyncio.CancelledError:
+                pass
+            finally:
                 self.session = None
-            except Exception as e:
-                log.error(f"Error during cleanup of server {self.name}: {e}")
-                raise
+                if self.status != "idle":
+                    self.status = "stopped"
 
 
-def load_mcp_config(server_conf_path: str = None) -> dict[str, StdioServerParameters | RemoteServerParameters]:
-    servers: dict[str, StdioServerParameters | RemoteServerParameters] = {}
+def default_config_path(server_conf_path: str = None) -> str:
     if not server_conf_path:
         home = os.path.expanduser("~")
         server_conf_path = os.path.join(home, ".mcp.json")
 
+    return server_conf_path
+
+
+def load_mcp_config(server_conf_path: str = None) -> dict[str, StdioServerParameters | RemoteServerParameters]:
+    servers: dict[str, StdioServerParameters | RemoteServerParameters] = {}
+    server_conf_path = default_config_path(server_conf_path)
+
     try:
         with open(server_conf_path, 'r') as f:
             data = json.load(f)
@@ -409,3 +973,50 @@ def load_mcp_config(server_conf_path: str = None) -> dict[str, StdioServerParame
     except Exception as e:
         print(f"Error loading mcp server configuration file: {e}")
         raise
+
+
+def load_server_options(server_conf_path: str = None) -> dict[str, ServerOptions]:
+    """Load the host side options of every entry in `mcpServers`, keys not known by `ServerOptions` are ignored."""
+    server_conf_path = default_config_path(server_conf_path)
+
+    try:
+        with open(server_conf_path, 'r') as f:
+            data = json.load(f)
+
+        return {
+            server_name: ServerOptions.model_validate(server_conf)
+            for server_name, server_conf in data["mcpServers"].items()
+        }
+    except Exception as e:
+        print(f"Error loading mcp server options from configuration file: {e}")
+        raise
+
+
+def load_tool_filter(server_conf_path: str = None) -> ToolFilter:
+    """Load the `tools` section of the configuration file, which is optional."""
+    server_conf_path = default_config_path(server_conf_path)
+
+    try:
+        with open(server_conf_path, 'r') as f:
+            data = json.load(f)
+
+        return ToolFilter.model_validate(data.get("tools", {}))
+    except Exception as e:
+        print(f"Error loading tool filter from configuration file: {e}")
+        raise
+
+
+def load_tool_cache_options(server_conf_path: str = None) -> ToolCacheOptions:
+    """Load the `toolCache` section of the configuration file, which is optional."""
+    server_conf_path = default_config_path(server_conf_path)
+
+    try:
+        with open(server_conf_path, 'r') as f:
+            data = json.load(f)
+
+        if "toolCache" not in data:
+            return ToolCacheOptions()
+        return ToolCacheOptions.model_validate({"enabled": True, **data["toolCache"]})
+    except Exception as e:
+        print(f"Error loading tool cache options from configuration file: {e}")
+        raise
@@ -144,14 +144,19 @@ def validate_input(value: Any, prop_config: Dict[str, Any]) -> Tuple[bool, str,
     return valid, msg, typed_value if valid else None
 
 class ElicitationCallback:
-    def __init__(self):
-        pass
+    def __init__(self, interactive: bool = True):
+        # Without a user at the terminal every request is declined
+        self.interactive = interactive
 
     async def __call__(
         self,
         context: RequestContext["ClientSession", Any],
         request: types.ElicitRequestParams,
     ) -> types.ElicitResult | types.ErrorData:
+        if not self.interactive:
+            log.warning(f"Declined extra information request from server, no user to ask: {request.message}")
+            return types.ElicitResult(action="decline")
+
         properties: list[tuple[str, bool, any]] = check_flat_schema(request.requestedSchema)
         properties_des = [prop[2]["title"] if prop[2].get("title", None) else prop[0] + "(required)" if prop[1] else prop[2]["title"] if prop[2].get("title", None) else prop[0] for prop in properties]
         property_inputs: Dict[str, Any] = {}
@@ -1,22 +1,127 @@
 from anyio.streams.memory import MemoryObjectReceiveStream
 from contextlib import asynccontextmanager
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import anyio
 import logging
+import os
+import queue
+import time
 
 log = logging.getLogger("mcp_cli_host")
 
-async def _monitor_server_stderr(read_stderr: MemoryObjectReceiveStream,):
-    async for message in read_stderr:
-        log.debug(
-            "👻 Received err from server: %s", message.decode() if isinstance(message, bytes) else message)
-            
+# Size of a stderr log file before it is rotated, and how many rotated files are kept
+LOG_FILE_MAX_BYTES = 10 * 1024 * 1024
+LOG_FILE_BACKUPS = 3
+
+# Window of the console echo rate limit in seconds
+ECHO_WINDOW = 1.0
+
+
+class StderrCapture:
+    """Stderr of a server, kept in a ring buffer of its latest lines.
+
+    Lines are echoed to the debug log at most `echo_rate` per second, the ones beyond are counted and reported
+    as suppressed at the end of the window. With `log_path` set, every line is also written to a rotating log file
+    by a background thread, so a noisy server never blocks the event loop on disk writes.
+    The ring buffer outlives the connection, the lines of a crashed server stay readable after it is gone.
+    """
+
+    def __init__(self, server_name: str, max_lines: int = 1000, echo_rate: float = 20.0, log_path: str | None = None) -> None:
+        self.server_name = server_name
+        self.lines: deque[str] = deque(maxlen=max_lines)
+        self.echo_rate = echo_rate
+        self.log_path = log_path
+        self.total: int = 0
+        self._window_start: float = 0.0
+        self._window_echoed: int = 0
+        self._suppressed: int = 0
+        self._file_handler: QueueHandler | None = None
+        self._file_listener: QueueListener | None = None
+
+    def record(self, line: str) -> None:
+        line = line.rstrip("\r\n")
+        self.total += 1
+        self.lines.append(line)
+        if self.log_path:
+            self._write(line)
+        self._echo(line)
+
+    def tail(self, n: int | None = None) -> list[str]:
+        lines = list(self.lines)
+        return lines if n is None else lines[-n:] if n > 0 else []
+
+    def _echo(self, line: str) -> None:
+        if not log.isEnabledFor(logging.DEBUG):
+            return
+
+        now = time.monotonic()
+        if now - self._window_start >= ECHO_WINDOW:
+            self.flush_suppressed()
+            self._window_start = now
+            self._window_echoed = 0
+
+        if self._window_echoed < self.echo_rate:
+            self._window_echoed += 1
+            log.debug("👻 Received err from server %s: %s", self.server_name, line)
+        else:
+            self._suppressed += 1
+
+    def flush_suppressed(self) -> None:
+        """Report the lines held back by the rate limit since the last report."""
+        if self._suppressed:
+            log.debug("👻 %d lines suppressed from server %s, see /stderr %s", self._suppressed, self.server_name, self.server_name)
+            self._suppressed = 0
+
+    def _write(self, line: str) -> None:
+        if self._file_handler is None:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+                file_handler = RotatingFileHandler(self.log_path, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding="utf-8")
+            except OSError as e:
+                log.warning(f"Can't write stderr of server {self.server_name} to {self.log_path}: {e}")
+                self.log_path = None
+                return
+            file_handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            records: queue.SimpleQueue = queue.SimpleQueue()
+            self._file_handler = QueueHandler(records)
+            self._file_listener = QueueListener(records, file_handler)
+            self._file_listener.start()
+
+        self._file_handler.handle(logging.makeLogRecord({"name": self.server_name, "levelno": logging.INFO, "levelname": "INFO", "msg": line}))
+
+    def close(self) -> None:
+        """Report what is still suppressed and flush the log file, the ring buffer is kept."""
+        self.flush_suppressed()
+        if self._file_listener is not None:
+            self._file_listener.stop()
+            for handler in self._file_listener.handlers:
+                handler.close()
+            self._file_listener = None
+            self._file_handler = None
+
+
+async def _monitor_server_stderr(read_stderr: MemoryObjectReceiveStream[str], capture: StderrCapture):
+    while True:
+        # Wake up once a window at least, the suppressed lines of a server gone quiet are reported too
+        with anyio.move_on_after(ECHO_WINDOW):
+            try:
+                message = await read_stderr.receive()
+            except (anyio.EndOfStream, anyio.ClosedResourceError):
+                return
+            capture.record(message.decode() if isinstance(message, bytes) else message)
+            continue
+        capture.flush_suppressed()
+
 @asynccontextmanager
 async def err_monitor(
-    read_stderr: MemoryObjectReceiveStream,
+    read_stderr: MemoryObjectReceiveStream[str],
+    capture: StderrCapture,
 ):
     async with anyio.create_task_group() as tg:
         try:
-            tg.start_soon(_monitor_server_stderr, read_stderr)
+            tg.start_soon(_monitor_server_stderr, read_stderr, capture)
             yield
         finally:
-            tg.cancel_scope.cancel()
\ No newline at end of file
+            tg.cancel_scope.cancel()
+            capture.close()
@@ -2,14 +2,27 @@ from mcp.shared.session import RequestResponder
 from mcp import types
 import logging
 from rich.progress import Progress
+from typing import Callable, Literal
 
 log = logging.getLogger("mcp_cli_host")
 
+ListKind = Literal["tools", "resources", "prompts"]
+
+LIST_CHANGED_NOTIFICATIONS: dict[type, ListKind] = {
+    types.ToolListChangedNotification: "tools",
+    types.ResourceListChangedNotification: "resources",
+    types.PromptListChangedNotification: "prompts",
+}
+
 
 class NotificationHandler:
-    def __init__(self):
+    def __init__(self, on_list_changed: Callable[[ListKind], None] | None = None, on_resource_updated: Callable[[str], None] | None = None):
         self.current_task = None
         self.process = Progress()
+        # Must not block: the handler runs inside the session's receive loop, which would also
+        # have to deliver the responses of any list request issued from here
+        self.on_list_changed = on_list_changed
+        self.on_resource_updated = on_resource_updated
 
     async def __call__(self,
                        message: RequestResponder[types.ServerRequest,
@@ -22,6 +35,17 @@ class NotificationHandler:
             log.error("Error: %s", message)
             return
         if isinstance(message, types.ServerNotification):
+            list_kind = LIST_CHANGED_NOTIFICATIONS.get(type(message.root))
+            if list_kind:
+                log.debug("📩 Received %s list changed notification from server", list_kind)
+                if self.on_list_changed:
+                    self.on_list_changed(list_kind)
+
+            if isinstance(message.root, types.ResourceUpdatedNotification):
+                log.debug("📩 Received resource updated notification from server: %s", message.root.params.uri)
+                if self.on_resource_updated:
+                    self.on_resource_updated(str(message.root.params.uri))
+
             if isinstance(message.root, types.LoggingMessageNotification):
                 message_obj: types.LoggingMessageNotification = message.root
                 log.debug(
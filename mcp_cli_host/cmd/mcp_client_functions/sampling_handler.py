@@ -1,4 +1,4 @@
-from mcp_cli_host.llm.base_provider import Provider
+from mcp_cli_host.llm.base_provider import Provider, ContextLengthExceededError
 from mcp.shared.context import RequestContext
 from mcp import ClientSession, types
 from typing import Any
@@ -13,14 +13,23 @@ console = Console()
 log = logging.getLogger("mcp_cli_host")
 
 class SamplingCallback:
-    def __init__(self, provider: Provider):
+    def __init__(self, provider: Provider, interactive: bool = True):
         self.provider = provider
+        # Without a user at the terminal to confirm, every request is rejected
+        self.interactive = interactive
 
     async def __call__(
         self,
         context: RequestContext["ClientSession", Any],
         params: types.CreateMessageRequestParams,
     ) -> types.CreateMessageResult | types.ErrorData:
+        if not self.interactive:
+            log.warning("Rejected sampling request from server, no user to confirm it")
+            return types.ErrorData(
+                code=types.INVALID_REQUEST,
+                message="Sampling needs a user to confirm it, which the client doesn't have",
+            )
+
         while True:
             try:
                 messages_rec = json.dumps(
@@ -40,33 +49,32 @@ class SamplingCallback:
 
                 if user_confirmation == "yes":
                     messages: list[GenericMsg] = []
-                    system_message = {
-                        "role": Role.SYSTEM.value,
-                        "content": params.systemPrompt
-                    }
-
                     messages.append(GenericMsg(
-                        message_content=json.dumps(system_message)
+                        role=Role.SYSTEM.value,
+                        content=params.systemPrompt
                     ))
                     # mcp SamplingMessage not match the message format of openai, meed transfer
                     # the message.content in openai is either a str or list[TextContent]
                     for msg in params.messages:
-                        new_msg = {
-                            "role": msg.role,
-                            "content": [msg.content.model_dump()],
-                        }
                         messages.append(GenericMsg(
-                            message_content=json.dumps(new_msg))
+                            role=msg.role,
+                            content=[msg.content.model_dump()])
                         )
 
                     with console.status("[bold bright_magenta]Thinking...[/bold bright_magenta]"):
                         try:
-                            llm_res: GenericMsg = self.provider.completions_create(
+                            llm_res: GenericMsg = await self.provider.acompletions_create(
                                 prompt="",
                                 messages=messages,
                                 tools=[],
                                 max_tokens=params.maxTokens,
                             )
+                        except ContextLengthExceededError as e:
+                            log.warning(f"{e}")
+                            return types.ErrorData(
+                                code=types.INVALID_REQUEST,
+                                message="The messages exceed the context length of the LLM",
+                            )
                         except Exception:
                             raise
 
@@ -0,0 +1,136 @@
+from mcp import types
+from collections import OrderedDict
+from pydantic import BaseModel
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+log = logging.getLogger("mcp_cli_host")
+
+
+class _CachedResource(BaseModel):
+    result: types.ReadResourceResult
+    # None for a subscribed resource, which stays valid until the server announces an update
+    expires_at: float | None = None
+    # Index of a content in `result` -> file its blob is stored in, the content itself keeps an empty blob
+    blob_paths: dict[int, str] = {}
+
+
+class ResourceCache:
+    """Contents of resources read from one server, by URI.
+
+    Subscribed resources are valid until the server sends `notifications/resources/updated` for them, the others
+    expire after `ttl` seconds, the least recently used ones are evicted beyond `max_entries`. Blobs longer than
+    `blob_threshold` characters are written to temporary files and read back on every hit, so large binary
+    resources don't stay in memory.
+
+    A read races with the updates announced while it is in flight, so it takes the `generation` of the URI
+    before it starts and `put` drops its result if an update or a `clear` came in between.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 256, blob_threshold: int = 256 * 1024) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.blob_threshold = blob_threshold
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: OrderedDict[str, _CachedResource] = OrderedDict()
+        self._dir: str | None = None
+        self._files: int = 0
+        # Updates announced per URI, and clears of the whole cache
+        self._updates: dict[str, int] = {}
+        self._clears: int = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, uri: str) -> types.ReadResourceResult | None:
+        entry = self._entries.get(uri)
+        if entry is not None and entry.expires_at is not None and entry.expires_at <= time.monotonic():
+            self.invalidate(uri)
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(uri)
+        if not entry.blob_paths:
+            return entry.result
+
+        contents = list(entry.result.contents)
+        for index, path in entry.blob_paths.items():
+            with open(path, "r", encoding="ascii") as f:
+                contents[index] = contents[index].model_copy(update={"blob": f.read()})
+        return entry.result.model_copy(update={"contents": contents})
+
+    def generation(self, uri: str) -> tuple[int, int]:
+        return self._clears, self._updates.get(uri, 0)
+
+    def put(self, uri: str, result: types.ReadResourceResult, subscribed: bool = False,
+            generation: tuple[int, int] | None = None) -> None:
+        """Cache the result of a read, unless the resource changed since `generation` was taken before the read."""
+        if generation is not None and generation != self.generation(uri):
+            log.debug(f"Resource {uri} changed while it was read, not caching it")
+            return
+
+        self.invalidate(uri)
+
+        blob_paths: dict[int, str] = {}
+        contents = list(result.contents)
+        for index, content in enumerate(contents):
+            if isinstance(content, types.BlobResourceContents) and len(content.blob) > self.blob_threshold:
+                blob_paths[index] = self._store(content.blob)
+                contents[index] = content.model_copy(update={"blob": ""})
+        if blob_paths:
+            result = result.model_copy(update={"contents": contents})
+
+        self._entries[uri] = _CachedResource(
+            result=result,
+            expires_at=None if subscribed else time.monotonic() + self.ttl,
+            blob_paths=blob_paths,
+        )
+        while len(self._entries) > self.max_entries:
+            self.invalidate(next(iter(self._entries)))
+
+    def _store(self, blob: str) -> str:
+        if self._dir is None:
+            self._dir = tempfile.mkdtemp(prefix="mcp-cli-host-resources-")
+
+        self._files += 1
+        path = os.path.join(self._dir, f"blob-{self._files}")
+        # The blob is kept base64 encoded, as it is served
+        with open(path, "w", encoding="ascii") as f:
+            f.write(blob)
+        return path
+
+    def updated(self, uri: str) -> None:
+        """The server announced an update of the resource."""
+        self._updates[uri] = self._updates.get(uri, 0) + 1
+        self.invalidate(uri)
+
+    def invalidate(self, uri: str) -> None:
+        entry = self._entries.pop(uri, None)
+        if entry is None:
+            return
+
+        for path in entry.blob_paths.values():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._updates.clear()
+        self._clears += 1
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
@@ -0,0 +1,99 @@
+from mcp import types
+from mcp_cli_host.cmd.mcp import ToolCacheOptions
+from mcp_cli_host.cmd.utils import COMMON_SEPERATOR, PREFIX_RESOURCE_TOOL
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from pydantic import BaseModel
+import json
+import logging
+import time
+
+log = logging.getLogger("mcp_cli_host")
+
+
+class ToolCacheStats(BaseModel):
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        calls = self.hits + self.misses
+        return self.hits / calls if calls else 0.0
+
+
+class ToolResultCache:
+    """LRU cache with a TTL for the results of tools which are safe to call again with the same arguments.
+
+    A tool is cached when its annotations say it is read-only, when it matches the `allow` patterns of the
+    configuration, or when it is generated from a resource template, which only reads. An idempotent tool
+    may still write, a cached result would hide what changed since, so that hint alone isn't enough.
+    Results are keyed by the qualified tool name and the canonical JSON of the arguments, error results are not kept.
+    """
+
+    def __init__(self, options: ToolCacheOptions | None = None) -> None:
+        self.options = options or ToolCacheOptions()
+        self._entries: OrderedDict[tuple[str, str], tuple[float, types.CallToolResult]] = OrderedDict()
+        self.stats: dict[str, ToolCacheStats] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.options.enabled
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def cacheable(self, tool: types.Tool) -> bool:
+        if not self.enabled:
+            return False
+
+        if tool.name.split(COMMON_SEPERATOR, 1)[-1].startswith(PREFIX_RESOURCE_TOOL):
+            return True
+        if tool.annotations and tool.annotations.readOnlyHint:
+            return True
+        return any(fnmatchcase(tool.name, pattern) for pattern in self.options.allow)
+
+    @staticmethod
+    def _key(name: str, arguments: dict[str, any]) -> tuple[str, str]:
+        return name, json.dumps(arguments or {}, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+    def get(self, name: str, arguments: dict[str, any]) -> types.CallToolResult | None:
+        stats = self.stats.setdefault(name, ToolCacheStats())
+        key = self._key(name, arguments)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, result = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                stats.hits += 1
+                return result
+            del self._entries[key]
+
+        stats.misses += 1
+        return None
+
+    def put(self, name: str, arguments: dict[str, any], result: types.CallToolResult) -> None:
+        if result.isError:
+            return
+
+        key = self._key(name, arguments)
+        self._entries[key] = (time.monotonic() + self.options.ttl, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.options.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, server_name: str | None = None, tool_prefix: str = "") -> int:
+        """Drop the results of one server's tools whose name starts with `tool_prefix`, of all tools without `server_name`.
+
+        Returns:
+            The number of dropped results.
+        """
+        if server_name is None:
+            dropped = len(self._entries)
+            self._entries.clear()
+            return dropped
+
+        prefix = f"{server_name}{COMMON_SEPERATOR}{tool_prefix}"
+        keys = [key for key in self._entries if key[0].startswith(prefix)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
@@ -0,0 +1,279 @@
+from mcp_cli_host.cmd.batch import BatchResult, trace_conversation
+from mcp_cli_host.cmd.catalog import ToolRegistry
+from mcp_cli_host.llm.base_provider import Provider
+from pydantic import BaseModel, Field, ValidationError
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+from sse_starlette.sse import EventSourceResponse
+from typing import Any, AsyncIterator, TYPE_CHECKING
+import asyncio
+import logging
+import time
+import uuid
+import uvicorn
+
+if TYPE_CHECKING:
+    from mcp_cli_host.cmd.app import ChatSession
+
+log = logging.getLogger("mcp_cli_host")
+
+
+class NewConversation(BaseModel):
+    exclude_tools: list[str] = Field(default_factory=list)
+    """(Optional) Tools this conversation doesn't offer, by qualified name or by tool name on any server."""
+
+
+class NewMessage(BaseModel):
+    prompt: str
+    stream: bool = False
+    """(Optional) Answer with server-sent events: `delta` with each piece of text, then `done` with the result."""
+
+
+def turn_start(history: list, earlier: set[int]) -> int:
+    """Index of the turn appended after the `earlier` messages (by id), the trailing ones which are new.
+
+    Meanwhile the older turns may have been pruned or replaced by a summary, so the index it started at is unreliable.
+    """
+    start = len(history)
+    while start > 0 and id(history[start - 1]) not in earlier:
+        start -= 1
+    return start
+
+
+class Conversation:
+    """A conversation of the API, its prompts are answered one after the other."""
+
+    def __init__(self, id: str, session: "ChatSession") -> None:
+        self.id = id
+        self.session = session
+        self.lock = asyncio.Lock()
+        self.created_at = time.time()
+        self.last_used = time.monotonic()
+        self.closed = False
+
+    async def close(self) -> None:
+        """Wait for the prompt being answered, then release the spilled results of the conversation."""
+        async with self.lock:
+            self.closed = True
+            self.session.close()
+
+
+class ApiServer:
+    """HTTP API with a history per conversation, all conversations share the servers and the providers of one host.
+
+    Endpoints:
+        POST /conversations: start a conversation, `{"exclude_tools": [...]}` is optional.
+        POST /conversations/{id}/messages: answer `{"prompt": ..., "stream": false}` in the conversation.
+        GET /conversations/{id}: the history of a conversation.
+        DELETE /conversations/{id}: end a conversation.
+        GET /tools: the tools a new conversation is offered.
+        GET /health: the status of the MCP servers.
+
+    Conversations unused for `idle_ttl` seconds are ended, at most `max_conversations` exist at once.
+    """
+
+    def __init__(self, session: "ChatSession", provider: Provider, compact_provider: Provider,
+                 idle_ttl: float = 3600.0, max_conversations: int = 1000) -> None:
+        self.session = session
+        self.provider = provider
+        self.compact_provider = compact_provider
+        self.idle_ttl = idle_ttl
+        self.max_conversations = max_conversations
+        self.conversations: dict[str, Conversation] = {}
+        self.tool_registry = ToolRegistry(session.host.catalog, session.host.tool_filter)
+        self.app = Starlette(routes=[
+            Route("/conversations", self.create_conversation, methods=["POST"]),
+            Route("/conversations/{id}", self.get_conversation, methods=["GET"]),
+            Route("/conversations/{id}", self.delete_conversation, methods=["DELETE"]),
+            Route("/conversations/{id}/messages", self.post_message, methods=["POST"]),
+            Route("/tools", self.list_tools, methods=["GET"]),
+            Route("/health", self.health, methods=["GET"]),
+        ])
+
+    @staticmethod
+    def error(status_code: int, message: str) -> JSONResponse:
+        return JSONResponse({"error": message}, status_code=status_code)
+
+    @staticmethod
+    async def parse(request: Request, model: type[BaseModel], optional: bool = False) -> BaseModel:
+        body = await request.body()
+        if not body and optional:
+            return model()
+        return model.model_validate_json(body)
+
+    def lookup(self, request: Request) -> Conversation | None:
+        conversation = self.conversations.get(request.path_params["id"])
+        if conversation is not None:
+            conversation.last_used = time.monotonic()
+        return conversation
+
+    async def expire_conversations(self) -> None:
+        """End the conversations idle for longer than `idle_ttl`, those answering a prompt are never idle."""
+        now = time.monotonic()
+        expired = [
+            conversation for conversation in self.conversations.values()
+            if not conversation.lock.locked() and now - conversation.last_used > self.idle_ttl
+        ]
+        for conversation in expired:
+            self.conversations.pop(conversation.id, None)
+            await conversation.close()
+            log.info(f"Conversation {conversation.id} expired")
+
+    async def run_expiry(self) -> None:
+        while True:
+            await asyncio.sleep(min(self.idle_ttl, 60.0))
+            await self.expire_conversations()
+
+    async def create_conversation(self, request: Request) -> Response:
+        try:
+            params: NewConversation = await self.parse(request, NewConversation, optional=True)
+        except ValidationError as e:
+            return self.error(400, str(e))
+
+        await self.expire_conversations()
+        if len(self.conversations) >= self.max_conversations:
+            return self.error(503, f"Too many conversations, at most {self.max_conversations} at once")
+
+        session = self.session.fork()
+        unknown = [name for name in params.exclude_tools if not session.tool_registry.exclude(name)]
+        if unknown:
+            session.close()
+            return self.error(400, f"Unknown tools: {', '.join(unknown)}")
+
+        conversation = Conversation(uuid.uuid4().hex, session)
+        self.conversations[conversation.id] = conversation
+        log.info(f"Conversation {conversation.id} created")
+        return JSONResponse({"id": conversation.id, "excluded_tools": sorted(session.tool_registry.excluded)}, status_code=201)
+
+    async def get_conversation(self, request: Request) -> Response:
+        conversation = self.lookup(request)
+        if conversation is None:
+            return self.error(404, "Conversation not found")
+
+        return JSONResponse({
+            "id": conversation.id,
+            "created_at": conversation.created_at,
+            "messages": [message.model_dump(mode="json", exclude={"token_usage"}, exclude_defaults=True)
+                         for message in conversation.session.history_message],
+        })
+
+    async def delete_conversation(self, request: Request) -> Response:
+        conversation = self.conversations.pop(request.path_params["id"], None)
+        if conversation is None:
+            return self.error(404, "Conversation not found")
+
+        await conversation.close()
+        log.info(f"Conversation {conversation.id} deleted")
+        return Response(status_code=204)
+
+    async def list_tools(self, request: Request) -> Response:
+        return JSONResponse([tool.model_dump(mode="json", exclude_none=True) for tool in self.tool_registry.tools])
+
+    async def health(self, request: Request) -> Response:
+        return JSONResponse({
+            "conversations": len(self.conversations),
+            "servers": {name: server.status for name, server in self.session.host.servers.items()},
+        })
+
+    async def post_message(self, request: Request) -> Response:
+        conversation = self.lookup(request)
+        if conversation is None:
+            return self.error(404, "Conversation not found")
+        try:
+            message: NewMessage = await self.parse(request, NewMessage)
+        except ValidationError as e:
+            return self.error(400, str(e))
+
+        if message.stream:
+            return EventSourceResponse(self.stream_answer(conversation, message.prompt))
+
+        async with conversation.lock:
+            if conversation.closed:
+                # Deleted or expired while the prompt waited for the lock
+                return self.error(404, "Conversation not found")
+            result = await self.answer(conversation, message.prompt)
+        return JSONResponse(result.model_dump(mode="json", exclude_none=True), status_code=500 if result.error else 200)
+
+    async def answer(self, conversation: Conversation, prompt: str, on_delta=None) -> BatchResult:
+        """Answer a prompt in the conversation, which has to be locked by the caller.
+
+        A prompt which fails or is cancelled leaves no trace in the history, a turn cut short, e.g. tool calls
+        without their results, would make the provider reject every later prompt of the conversation.
+        """
+        if conversation.closed:
+            # Deleted or expired while the prompt waited for the lock
+            return BatchResult(id=conversation.id, error="Conversation not found")
+
+        session = conversation.session
+        session.fit_history()
+        # Kept to hold on to the messages, so their ids stay unique until the turn is found
+        earlier = list(session.history_message)
+        started = time.perf_counter()
+        error: str | None = None
+        try:
+            await session.run_promt(provider=self.provider, prompt=prompt, on_delta=on_delta)
+        except asyncio.CancelledError:
+            del session.history_message[turn_start(session.history_message, {id(message) for message in earlier}):]
+            raise
+        except Exception as e:
+            log.error(f"Prompt of conversation {conversation.id} failed: {e}")
+            error = str(e) or type(e).__name__
+
+        start = turn_start(session.history_message, {id(message) for message in earlier})
+        result = trace_conversation(session.history_message[start:])
+        result.id = conversation.id
+        result.duration = round(time.perf_counter() - started, 3)
+        result.error = error or (None if result.response is not None else "No response from the LLM")
+        if result.error:
+            del session.history_message[start:]
+        session.schedule_compaction(self.compact_provider)
+
+        conversation.last_used = time.monotonic()
+        return result
+
+    async def stream_answer(self, conversation: Conversation, prompt: str) -> AsyncIterator[dict[str, Any]]:
+        deltas: asyncio.Queue[str | None] = asyncio.Queue()
+
+        async with conversation.lock:
+            task = asyncio.create_task(self.answer(conversation, prompt, on_delta=deltas.put_nowait))
+            task.add_done_callback(lambda _: deltas.put_nowait(None))
+            try:
+                while (delta := await deltas.get()) is not None:
+                    yield {"event": "delta", "data": delta}
+                result = await task
+            finally:
+                # The client went away, don't answer to nobody
+                if not task.done():
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+
+        yield {"event": "done", "data": result.model_dump_json(exclude_none=True)}
+
+    def close(self) -> None:
+        """End all conversations, the prompts still being answered are cancelled with the server already."""
+        for conversation in self.conversations.values():
+            conversation.closed = True
+            conversation.session.close()
+        self.conversations.clear()
+
+
+async def run_serve(session: "ChatSession", host: str = "127.0.0.1", port: int = 8000,
+                    idle_ttl: float = 3600.0, max_conversations: int = 1000) -> None:
+    """Start the servers of the session's host once, then serve conversations over HTTP until interrupted."""
+    mcp_host = session.host
+    api = ApiServer(session, mcp_host.get_provider(), mcp_host.get_provider(session.compact_model),
+                    idle_ttl=idle_ttl, max_conversations=max_conversations)
+    expiry_task: asyncio.Task | None = None
+    try:
+        await mcp_host.start()
+        expiry_task = asyncio.create_task(api.run_expiry(), name="expire-conversations")
+        config = uvicorn.Config(api.app, host=host, port=port, log_config=None, log_level="warning")
+        log.info(f"Serving conversations on http://{host}:{port}")
+        await uvicorn.Server(config).serve()
+    finally:
+        if expiry_task:
+            expiry_task.cancel()
+        api.close()
+        await mcp_host.close()
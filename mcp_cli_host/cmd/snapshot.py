@@ -0,0 +1,94 @@
+from mcp import types, StdioServerParameters
+from mcp_cli_host.cmd.mcp import RemoteServerParameters
+from mcp_cli_host.cmd.catalog import ServerCatalog
+from pydantic import BaseModel
+from pathlib import Path
+import hashlib
+import json
+import logging
+import os
+import time
+
+log = logging.getLogger("mcp_cli_host")
+
+# 2: tools keep their annotations, resource template tools their URI template
+SNAPSHOT_FORMAT = 2
+
+
+class CatalogSnapshot(BaseModel):
+    """What the host learned from a server during its last run, enough to open the prompt before it connects."""
+    format: int = SNAPSHOT_FORMAT
+    key: str
+    server_name: str
+    server_version: str
+    saved_at: float
+    initialize_result: types.InitializeResult
+    catalog: ServerCatalog
+
+
+def snapshot_dir() -> Path:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(cache_home) / "mcp-cli-host" / "catalog"
+
+
+def snapshot_key(server_name: str, config: StdioServerParameters | RemoteServerParameters) -> str:
+    """Hash of everything that decides what a server offers.
+
+    `load_mcp_config` merges the whole host environment into `env`, only the variables which differ from
+    it are hashed, otherwise any change in the shell would invalidate the snapshot.
+    """
+    if isinstance(config, RemoteServerParameters):
+        identity = {"url": str(config.url), "headers": config.headers}
+    else:
+        identity = {
+            "command": config.command,
+            "args": config.args,
+            "env": {key: value for key, value in (config.env or {}).items() if os.environ.get(key) != value},
+            "cwd": str(config.cwd) if config.cwd else None,
+        }
+
+    identity["name"] = server_name
+    return hashlib.sha256(json.dumps(identity, sort_keys=True).encode()).hexdigest()
+
+
+def load_snapshot(server_name: str, config: StdioServerParameters | RemoteServerParameters) -> CatalogSnapshot | None:
+    key = snapshot_key(server_name, config)
+    path = snapshot_dir() / f"{key}.json"
+    if not path.exists():
+        return None
+
+    try:
+        snapshot = CatalogSnapshot.model_validate_json(path.read_bytes())
+    except Exception as e:
+        log.debug(f"Ignore unreadable catalog snapshot of server {server_name}: {e}")
+        return None
+
+    if snapshot.format != SNAPSHOT_FORMAT or snapshot.key != key:
+        return None
+
+    return snapshot
+
+
+def save_snapshot(server_name: str,
+                  config: StdioServerParameters | RemoteServerParameters,
+                  initialize_result: types.InitializeResult,
+                  catalog: ServerCatalog) -> None:
+    key = snapshot_key(server_name, config)
+    snapshot = CatalogSnapshot(
+        key=key,
+        server_name=server_name,
+        server_version=initialize_result.serverInfo.version,
+        saved_at=time.time(),
+        initialize_result=initialize_result,
+        catalog=catalog,
+    )
+
+    directory = snapshot_dir()
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        # Write aside and rename, a concurrent reader never sees half a file
+        tmp_path = directory / f"{key}.json.{os.getpid()}.tmp"
+        tmp_path.write_text(snapshot.model_dump_json(by_alias=True, exclude_none=True))
+        os.replace(tmp_path, directory / f"{key}.json")
+    except OSError as e:
+        log.warning(f"Failed to save catalog snapshot of server {server_name}: {e}")
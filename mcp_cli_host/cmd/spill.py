@@ -0,0 +1,135 @@
+from mcp import types
+from mcp_cli_host.cmd.utils import COMMON_SEPERATOR
+import logging
+import mmap
+import os
+import secrets
+import shutil
+import tempfile
+
+log = logging.getLogger("mcp_cli_host")
+
+# Name of the pseudo server which offers the tools implemented by the host itself, no configured server may take it
+HOST_SERVER_NAME = "host"
+READ_SPILLED_TOOL = f"{HOST_SERVER_NAME}{COMMON_SEPERATOR}read_spilled"
+
+# Bytes returned by one read of a spilled result when the model asks for more
+DEFAULT_READ_LENGTH = 20000
+
+READ_SPILLED_SCHEMA = {
+    "type": "object",
+    "required": ["handle"],
+    "properties": {
+        "handle": {
+            "type": "string",
+            "description": "handle of the spilled tool result",
+        },
+        "offset": {
+            "type": "integer",
+            "description": "byte offset to start reading at, 0 by default",
+        },
+        "length": {
+            "type": "integer",
+            "description": f"number of bytes to read, {DEFAULT_READ_LENGTH} by default",
+        },
+    },
+}
+
+
+def read_spilled_tool() -> types.Tool:
+    return types.Tool(
+        name=READ_SPILLED_TOOL,
+        description="Read part of a large tool result which was truncated in the conversation, by the handle given in the truncated result.",
+        inputSchema=READ_SPILLED_SCHEMA,
+    )
+
+
+class SpillStore:
+    """Keeps large tool results out of the conversation.
+
+    A text above `threshold` bytes of UTF-8 is written to a temporary file which is memory mapped, the conversation
+    only gets a preview and a handle, which the model reads through the `host--read_spilled` tool. Sizes, previews
+    and reads all count bytes, so the offsets the model is told about are the ones it reads at.
+    Every conversation has a store of its own, handles are random and only resolve in the store which made them.
+    The files are removed by `close`.
+    """
+
+    def __init__(self, threshold: int, preview_bytes: int = 2000) -> None:
+        self.threshold = threshold
+        self.preview_bytes = preview_bytes
+        self._dir: str | None = None
+        self._spilled: dict[str, mmap.mmap] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    @property
+    def has_spilled(self) -> bool:
+        return len(self._spilled) > 0
+
+    def spill(self, tool_name: str, content: list[types.ContentBlock]) -> list[types.ContentBlock]:
+        """Replace text contents above the threshold by their preview and handle."""
+        if not self.enabled:
+            return content
+
+        spilled_content: list[types.ContentBlock] = []
+        for block in content:
+            # A character takes at most 4 bytes, only texts which may pass the threshold are encoded
+            if isinstance(block, types.TextContent) and len(block.text) * 4 > self.threshold \
+                    and len(data := block.text.encode("utf-8")) > self.threshold:
+                handle = self._store(data)
+                log.info(f"Tool result of [{tool_name}] spilled to disk: {len(data)} bytes, handle {handle}")
+                # Like a read, the preview drops a multi-byte character cut at its end. It is never longer than the
+                # threshold, or a spilled result could take more of the context than the original
+                preview = data[:min(self.preview_bytes, self.threshold)].decode("utf-8", errors="ignore")
+                block = types.TextContent(
+                    type="text",
+                    text=f"{preview}\n\n"
+                         f"[Output truncated, bytes 0-{len(preview.encode('utf-8'))} of {len(data)} are shown, all are stored under the handle '{handle}'. "
+                         f"Call the tool '{READ_SPILLED_TOOL}' with this handle, an offset and a length to read more of it.]",
+                )
+            spilled_content.append(block)
+
+        return spilled_content
+
+    def _store(self, data: bytes) -> str:
+        if self._dir is None:
+            self._dir = tempfile.mkdtemp(prefix="mcp-cli-host-spill-")
+
+        handle = f"spill-{secrets.token_hex(8)}"
+        path = os.path.join(self._dir, handle)
+        with open(path, "wb+") as f:
+            f.write(data)
+            f.flush()
+            # The mapping stays valid after the file is closed, pages are read from disk on demand
+            self._spilled[handle] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return handle
+
+    def read(self, handle: str, offset: int = 0, length: int = DEFAULT_READ_LENGTH) -> types.CallToolResult:
+        spilled = self._spilled.get(handle)
+        if spilled is None:
+            return types.CallToolResult(
+                content=[types.TextContent(type="text", text=f"Unknown handle: {handle}")],
+                isError=True,
+            )
+
+        if self.enabled:
+            # Reading more at once would bring the large result back into the conversation
+            length = min(length, self.threshold)
+        offset = min(max(offset, 0), len(spilled))
+        end = min(offset + max(length, 1), len(spilled))
+        # A read may cut a multi-byte character at its ends, the partial bytes are dropped
+        text = spilled[offset:end].decode("utf-8", errors="ignore")
+        return types.CallToolResult(
+            content=[types.TextContent(type="text", text=f"[{handle}: bytes {offset}-{end} of {len(spilled)}]\n{text}")],
+            isError=False,
+        )
+
+    def close(self) -> None:
+        for spilled in self._spilled.values():
+            spilled.close()
+        self._spilled.clear()
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
@@ -1,14 +1,15 @@
 import os
 import sys
+import time
 from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Literal, TextIO
+from typing import AsyncIterator, Generic, Literal, TextIO, TypeVar
 
 import anyio
 import anyio.lowlevel
+from anyio.abc import ByteReceiveStream, ObjectSendStream
 from anyio.streams.memory import MemoryObjectReceiveStream, MemoryObjectSendStream
-from anyio.streams.text import TextReceiveStream
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 
 import mcp.types as types
 from mcp.shared.message import SessionMessage
@@ -33,6 +34,97 @@ DEFAULT_INHERITED_ENV_VARS = (
 )
 
 
+# Largest message accepted from a server, a longer line is dropped
+DEFAULT_MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+
+# Validates and serializes straight from and to bytes, no intermediate str
+_message_adapter: TypeAdapter[types.JSONRPCMessage] = TypeAdapter(types.JSONRPCMessage)
+
+
+class MessageTooLargeError(Exception):
+    """A server sent a line longer than the maximum message size."""
+
+
+class StreamBufferSizes(BaseModel):
+    """Number of messages each stream between the server process and the session buffers, 0 makes every send wait for the receiver."""
+
+    stdout: int = Field(default=16, ge=0)
+    """Messages read from the server, waiting for the session."""
+
+    stdin: int = Field(default=16, ge=0)
+    """Messages of the session, waiting to be written to the server."""
+
+    stderr: int = Field(default=64, ge=0)
+    """Lines the server wrote to stderr, waiting to be logged."""
+
+
+class StreamStats:
+    """Backpressure metrics of one stream: how full it is and how long senders waited for room."""
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.sent = 0
+        self.high_water = 0
+        self.blocked = 0
+        self.blocked_seconds = 0.0
+        self._stream: MemoryObjectSendStream | None = None
+
+    @property
+    def depth(self) -> int:
+        """Messages currently waiting in the stream."""
+        if self._stream is None:
+            return 0
+        try:
+            return self._stream.statistics().current_buffer_used
+        except anyio.ClosedResourceError:
+            return 0
+
+    def __str__(self) -> str:
+        return (f"depth {self.depth}/{self.capacity}, high-water {self.high_water}, sent {self.sent}, "
+                f"blocked {self.blocked} times for {self.blocked_seconds:.3f}s")
+
+
+class TransportStats:
+    """Backpressure metrics of the streams of a stdio transport, filled in by `stdio_client`."""
+
+    def __init__(self, buffer_sizes: StreamBufferSizes | None = None) -> None:
+        buffer_sizes = buffer_sizes or StreamBufferSizes()
+        self.stdout = StreamStats(buffer_sizes.stdout)
+        self.stdin = StreamStats(buffer_sizes.stdin)
+        self.stderr = StreamStats(buffer_sizes.stderr)
+
+
+T = TypeVar("T")
+
+
+class MeteredSendStream(ObjectSendStream[T], Generic[T]):
+    """Send side of a memory object stream which records its `StreamStats`."""
+
+    def __init__(self, stream: MemoryObjectSendStream[T], stats: StreamStats) -> None:
+        self._stream = stream
+        self._stats = stats
+        stats._stream = stream
+
+    async def send(self, item: T) -> None:
+        try:
+            self._stream.send_nowait(item)
+        except anyio.WouldBlock:
+            started = time.perf_counter()
+            try:
+                await self._stream.send(item)
+            finally:
+                self._stats.blocked += 1
+                self._stats.blocked_seconds += time.perf_counter() - started
+
+        self._stats.sent += 1
+        depth = self._stream.statistics().current_buffer_used
+        if depth > self._stats.high_water:
+            self._stats.high_water = depth
+
+    async def aclose(self) -> None:
+        await self._stream.aclose()
+
+
 def get_default_environment() -> dict[str, str]:
     """
     Returns a default environment object including only environment variables deemed
@@ -87,24 +179,80 @@ class StdioServerParameters(BaseModel):
     """
 
 
+async def _read_lines(stream: ByteReceiveStream, max_size: int) -> AsyncIterator[bytes | MessageTooLargeError]:
+    """
+    Split a byte stream into lines without the newline.
+
+    Chunks are appended to one buffer which is scanned for newlines only from
+    where the previous scan stopped, and trimmed once per chunk, so a message
+    arriving in many chunks costs linear time. A line beyond `max_size` bytes
+    is skipped up to its newline and reported as `MessageTooLargeError`.
+    """
+    buffer = bytearray()
+    scanned = 0
+    discarding = False
+
+    async for chunk in stream:
+        buffer += chunk
+
+        if discarding:
+            newline = buffer.find(b"\n")
+            if newline == -1:
+                buffer.clear()
+                continue
+            del buffer[: newline + 1]
+            scanned = 0
+            discarding = False
+
+        start = 0
+        while (newline := buffer.find(b"\n", scanned)) != -1:
+            if newline - start > max_size:
+                yield MessageTooLargeError(f"Message of {newline - start} bytes exceeds the maximum of {max_size} bytes, dropped")
+            else:
+                yield bytes(buffer[start:newline])
+            start = scanned = newline + 1
+
+        del buffer[:start]
+        scanned = len(buffer)
+
+        if len(buffer) > max_size:
+            yield MessageTooLargeError(f"Message exceeds the maximum of {max_size} bytes, dropped")
+            buffer.clear()
+            scanned = 0
+            discarding = True
+
+
 @asynccontextmanager
-async def stdio_client(server: StdioServerParameters):
+async def stdio_client(
+    server: StdioServerParameters,
+    max_message_size: int = DEFAULT_MAX_MESSAGE_SIZE,
+    stats: TransportStats | None = None,
+):
     """
     Client transport for stdio: this will connect to a server by spawning a
     process and communicating with it over stdin/stdout.
+
+    Messages longer than `max_message_size` bytes are dropped, which guards
+    against runaway servers. The buffer sizes of the streams are taken from
+    `stats`, which records their backpressure metrics.
     """
+    stats = stats or TransportStats()
+
     read_stream: MemoryObjectReceiveStream[SessionMessage | Exception]
-    read_stream_writer: MemoryObjectSendStream[SessionMessage | Exception]
+    read_stream_writer: ObjectSendStream[SessionMessage | Exception]
 
-    read_stream_err: MemoryObjectReceiveStream[types.JSONRPCMessage | Exception]
-    read_stream_writer_err: MemoryObjectSendStream[types.JSONRPCMessage | Exception]
+    read_stream_err: MemoryObjectReceiveStream[str]
+    read_stream_writer_err: ObjectSendStream[str]
 
-    write_stream: MemoryObjectSendStream[SessionMessage]
+    write_stream: ObjectSendStream[SessionMessage]
     write_stream_reader: MemoryObjectReceiveStream[SessionMessage]
 
-    read_stream_writer, read_stream = anyio.create_memory_object_stream(0)
-    read_stream_writer_err, read_stream_err = anyio.create_memory_object_stream(0)
-    write_stream, write_stream_reader = anyio.create_memory_object_stream(0)
+    read_stream_writer, read_stream = anyio.create_memory_object_stream(stats.stdout.capacity)
+    read_stream_writer_err, read_stream_err = anyio.create_memory_object_stream(stats.stderr.capacity)
+    write_stream, write_stream_reader = anyio.create_memory_object_stream(stats.stdin.capacity)
+    read_stream_writer = MeteredSendStream(read_stream_writer, stats.stdout)
+    read_stream_writer_err = MeteredSendStream(read_stream_writer_err, stats.stderr)
+    write_stream = MeteredSendStream(write_stream, stats.stdin)
 
     try:
         command = _get_executable_command(server.command)
@@ -126,29 +274,31 @@ async def stdio_client(server: StdioServerParameters):
         await read_stream_writer_err.aclose()
         raise
 
+    # JSON is UTF-8 already, other encodings are converted
+    utf8 = server.encoding.lower().replace("_", "-") in ("utf-8", "utf8")
+
     async def stdout_reader():
         assert process.stdout, "Opened process is missing stdout"
 
         try:
             async with read_stream_writer:
-                buffer = ""
-                async for chunk in TextReceiveStream(
-                    process.stdout,
-                    encoding=server.encoding,
-                    errors=server.encoding_error_handler,
-                ):
-                    lines = (buffer + chunk).split("\n")
-                    buffer = lines.pop()
-
-                    for line in lines:
-                        try:
-                            message = types.JSONRPCMessage.model_validate_json(line)
-                        except Exception as exc:
-                            await read_stream_writer.send(exc)
-                            continue
-
-                        session_message = SessionMessage(message)
-                        await read_stream_writer.send(session_message)
+                async for line in _read_lines(process.stdout, max_message_size):
+                    if isinstance(line, Exception):
+                        await read_stream_writer.send(line)
+                        continue
+                    if not line.strip():
+                        continue
+
+                    try:
+                        if not utf8:
+                            line = line.decode(server.encoding, server.encoding_error_handler)
+                        message = _message_adapter.validate_json(line)
+                    except Exception as exc:
+                        await read_stream_writer.send(exc)
+                        continue
+
+                    session_message = SessionMessage(message)
+                    await read_stream_writer.send(session_message)
         except anyio.ClosedResourceError:
             await anyio.lowlevel.checkpoint()
 
@@ -157,17 +307,10 @@ async def stdio_client(server: StdioServerParameters):
 
         try:
             async with read_stream_writer_err:
-                buffer = ""
-                async for chunk in TextReceiveStream(
-                    process.stderr,
-                    encoding=server.encoding,
-                    errors=server.encoding_error_handler,
-                ):
-                    lines = (buffer + chunk).split("\n")
-                    buffer = lines.pop()
-
-                    for line in lines:
-                        await read_stream_writer_err.send(line)
+                async for line in _read_lines(process.stderr, max_message_size):
+                    if isinstance(line, Exception):
+                        continue
+                    await read_stream_writer_err.send(line.decode(server.encoding, "replace"))
         except anyio.ClosedResourceError:
             await anyio.lowlevel.checkpoint()
 
@@ -177,13 +320,10 @@ async def stdio_client(server: StdioServerParameters):
         try:
             async with write_stream_reader:
                 async for session_message in write_stream_reader:
-                    json = session_message.message.model_dump_json(by_alias=True, exclude_none=True)
-                    await process.stdin.send(
-                        (json + "\n").encode(
-                            encoding=server.encoding,
-                            errors=server.encoding_error_handler,
-                        )
-                    )
+                    data = _message_adapter.dump_json(session_message.message, by_alias=True, exclude_none=True)
+                    if not utf8:
+                        data = data.decode().encode(server.encoding, server.encoding_error_handler)
+                    await process.stdin.send(data + b"\n")
         except anyio.ClosedResourceError:
             await anyio.lowlevel.checkpoint()
 
@@ -1,9 +1,13 @@
-from mcp_cli_host.llm.models import GenericMsg
+from mcp_cli_host.llm.models import GenericMsg, Role
+from mcp_cli_host.llm.tokens import TokenCounter
 from mcp import types
 from uritemplate import URITemplate
 from typing import List
+import logging
 import re
 
+log = logging.getLogger("mcp_cli_host")
+
 CLEAR_RIGHT = "\033[K"
 PREV_LINE = "\033[F"
 
@@ -12,12 +16,14 @@ MARKDOWN = """
 The following commands are available:
 - **/help**: Show this help message
 - **/tools**: List all available tools
-- **/exclude_tool**: Exclude specific tool from the conversation, example: `/exclude_tool tool_name`
+- **/exclude_tool**: Exclude specific tool from the conversation, example: `/exclude_tool tool_name` or `/exclude_tool server--tool_name`
 - **/resources**: List all available resources
 - **/get_resource**: Get specific resources by uri, example: `/get_resource resource_uri`
 - **/prompts**: List all available prompts
 - **/get_prompt**: Get specific prompt by name, example: `/get_prompt prompt_name`
 - **/servers**: List configured MCP servers
+- **/stderr**: Show the latest stderr lines of a server, example: `/stderr server_name` or `/stderr server_name 200`
+- **/cache**: Show the hit rates of the tool result cache, `/cache clear` or `/cache clear server_name` drops cached results
 - **/history**: Display conversation history
 - **/quit**: Exit the application
 
@@ -55,6 +61,36 @@ def prune_messages(messages: list[GenericMsg], message_window: int, has_sys_prom
     return messages
 
 
+def group_turns(messages: list[GenericMsg]) -> list[list[GenericMsg]]:
+    """Split messages into turns, each starts with a user message and holds everything which answers it,
+    so an assistant message with tool_calls always stays together with the tool results."""
+    turns: list[list[GenericMsg]] = []
+    for message in messages:
+        if not turns or message.role == Role.USER.value:
+            turns.append([])
+        turns[-1].append(message)
+
+    return turns
+
+
+def prune_messages_by_tokens(messages: list[GenericMsg], max_tokens: int, token_counter: TokenCounter, has_sys_prompt: bool = False) -> list[GenericMsg]:
+    """Evict the oldest turns until the messages fit into `max_tokens`, the latest turn is always kept."""
+    head = messages[:1] if has_sys_prompt else []
+    turns = group_turns(messages[len(head):])
+
+    total = token_counter.total(messages)
+    evicted = 0
+    while total > max_tokens and len(turns) - evicted > 1:
+        total -= token_counter.total(turns[evicted])
+        evicted += 1
+
+    if evicted == 0:
+        return messages
+
+    log.info(f"Evicted {evicted} oldest turns from history, about {total} tokens left")
+    return head + [message for turn in turns[evicted:] for message in turn]
+
+
 SERVER_CARD = """
 
 ---
@@ -63,7 +99,7 @@ SERVER_CARD = """
 *Protocol Version*: {protocol_version}     
 *Server Name*: {name}    
 *Version*: {version}   
-*Capabilities*:
+{init_time}*Capabilities*:
 - {tool_enable} Tools
 - {prompts_enable} Prompts
 - {resources_enable} Resources
@@ -73,7 +109,7 @@ SERVER_CARD = """
 """
 
 
-def format_server_card(initialize_result: types.InitializeResult) -> str:
+def format_server_card(initialize_result: types.InitializeResult, init_time: float | None = None) -> str:
     name = initialize_result.serverInfo.name
     version = initialize_result.serverInfo.version
     protocol_version = initialize_result.protocolVersion
@@ -91,6 +127,7 @@ def format_server_card(initialize_result: types.InitializeResult) -> str:
         resources_enable=resources_enable,
         logging_enable=logging_enable,
         protocol_version=protocol_version,
+        init_time=f"*Init Time*: {init_time:.2f}s    \n" if init_time is not None else "",
     )
 
 
@@ -118,12 +155,13 @@ INPUT_SCHEMA_TEMPLATE = {
 
 def build_input_schema(
     original_uri_template: str,
-    properties: list[str] | None = None
+    properties: list[str] | None = None,
+    required: list[str] | None = None
 ) -> dict[str, any]:
-    """Build an input schema for a tool."""
+    """Build an input schema for a tool, all properties are required unless `required` is given."""
     schema = {
         "type": "object",
-        "required": [property for property in properties] if properties else [],
+        "required": list(required if required is not None else properties or []),
         "properties": {
             property: {
                 "type": "string",
@@ -134,6 +172,41 @@ def build_input_schema(
     return schema
 
 
+def compile_uri_template(template: str) -> URITemplate:
+    """
+    Parse a URI template string (RFC 6570)
+
+    Args:
+        template: URI template string (e.g. "https://api.example.com/{user}{?q}")
+
+    Returns:
+        The parsed template, which expands variables according to their operators
+
+    Raises:
+        ValueError: If template format is invalid
+    """
+    try:
+        return URITemplate(template)
+    except Exception as e:
+        raise ValueError(f"Invalid URI template: {template}") from e
+
+
+def uri_template_variables(template: URITemplate, required_only: bool = False) -> List[str]:
+    """Variable names of a parsed template in the order they appear, e.g. ["user", "q"].
+
+    With `required_only`, only the variables of simple and reserved expansions (`{x}`, `{+x}`), the other operators
+    (`{?q}`, `{/path*}`, ...) leave an undefined variable out of the URI.
+    """
+    names: List[str] = []
+    for variable in template.variables:
+        if required_only and variable.operator.value not in ("", "+"):
+            continue
+        for name in variable.variable_names:
+            if name not in names:
+                names.append(name)
+    return names
+
+
 def extract_variables_from_uri_template(template: str) -> List[str]:
     """
     Extract all variable names from a URI template string
@@ -147,30 +220,59 @@ def extract_variables_from_uri_template(template: str) -> List[str]:
     Raises:
         ValueError: If template format is invalid
     """
-    try:
-        parsed = URITemplate(template)
-        return list(parsed.variable_names)
-    except Exception as e:
-        raise ValueError(f"Invalid URI template: {template}") from e 
+    return uri_template_variables(compile_uri_template(template))
+
+
+class ResourceTemplateIndex:
+    """Parsed URI templates of the tools generated from resource templates, by qualified tool name.
+
+    Templates are parsed once when the tools are generated, reading a resource by template then costs a lookup
+    and the expansion. Tools which come from a catalog snapshot are parsed on their first use.
+    """
+
+    def __init__(self) -> None:
+        self._templates: dict[str, URITemplate] = {}
+
+    def replace(self, templates: dict[str, URITemplate]) -> None:
+        self._templates = templates
+
+    def expand(self, tool: types.Tool, arguments: dict[str, any]) -> str:
+        """Expand the template of `tool` with the arguments, undefined variables are left out as RFC 6570 says."""
+        template = self._templates.get(tool.name)
+        if template is None:
+            uri_template = (tool.meta or {}).get(URL_TEMPLATE_KEY)
+            if not uri_template:
+                raise ValueError(f"Tool {tool.name} has no URI template")
+            template = self._templates[tool.name] = compile_uri_template(uri_template)
+
+        return template.expand({name: value for name, value in (arguments or {}).items() if value is not None})
+
 
 def generated_tools_from_resource_templates(
     server_name: str,
-    resource_templates: list[types.ResourceTemplate]
+    resource_templates: list[types.ResourceTemplate],
+    template_index: ResourceTemplateIndex | None = None,
 ) -> list[types.Tool]:
-    """Generate tools from resource templates."""
+    """Generate tools from resource templates, their parsed templates go into `template_index`."""
     tools: list[types.Tool] = []
+    templates: dict[str, URITemplate] = {}
     for index, template in enumerate(resource_templates):
+        name = server_name + COMMON_SEPERATOR + PREFIX_RESOURCE_TOOL + str(index)
+        templates[name] = compile_uri_template(template.uriTemplate)
         tools.append(
             types.Tool(
-                name=server_name + COMMON_SEPERATOR + PREFIX_RESOURCE_TOOL + str(index),
+                name=name,
                 description=template.description if template.description else "Get resource from url:" + template.uriTemplate,
                 inputSchema=build_input_schema(
                     original_uri_template=template.uriTemplate,
-                    properties=extract_variables_from_uri_template(
-                        template.uriTemplate)
+                    properties=uri_template_variables(templates[name]),
+                    required=uri_template_variables(templates[name], required_only=True)
                 ),
-                meta={URL_TEMPLATE_KEY: template.uriTemplate}, 
+                # `meta` is populated by its alias only
+                _meta={URL_TEMPLATE_KEY: template.uriTemplate},
             )
         )
 
+    if template_index is not None:
+        template_index.replace(templates)
     return tools
@@ -1,3 +1,95 @@
 from rich.console import Console
+from rich.live import Live
+from rich.markdown import Markdown
+from rich.status import Status
+from typing import Optional
+import asyncio
+import threading
 
-console = Console()
\ No newline at end of file
+console = Console()
+
+
+class LiveMarkdown:
+    """Render streamed assistant text as Markdown which grows in place.
+
+    The live view is only opened with the first non-empty delta, so a response which
+    turns out to be pure tool calls leaves the terminal untouched.
+    """
+
+    def __init__(self, status: Optional[Status] = None):
+        self.status = status
+        self.parts: list[str] = []
+        self.live: Optional[Live] = None
+        self._markdown: Optional[Markdown] = None
+        self._rendered_parts = 0
+
+    def __call__(self, delta: str) -> None:
+        if not delta:
+            return
+
+        if self.live is None:
+            # rich allows only one live display at a time, the spinner has to go first
+            if self.status:
+                self.status.stop()
+            console.print("\n 🤖 [bold bright_yellow]Assistant[/bold bright_yellow]:\n")
+            self.live = Live(console=console, refresh_per_second=8, vertical_overflow="visible", get_renderable=self._render)
+            self.live.start()
+
+        self.parts.append(delta)
+
+    def _render(self) -> Markdown:
+        # Called on every refresh tick, only re-parse when new deltas arrived since the last one
+        if self._markdown is None or self._rendered_parts != len(self.parts):
+            self._rendered_parts = len(self.parts)
+            self._markdown = Markdown("".join(self.parts))
+        return self._markdown
+
+    @property
+    def rendered(self) -> bool:
+        return self.live is not None
+
+    def close(self) -> None:
+        if self.live is not None:
+            self.live.stop()
+            console.print("\n")
+
+
+async def ainput(prompt: str = "") -> str:
+    """`console.input` which keeps the event loop running while waiting for the user.
+
+    The line is read on a daemon thread, so background work (server startup, notifications)
+    goes on meanwhile and a pending read never blocks the interpreter from exiting.
+
+    Raises:
+        KeyboardInterrupt: If the user pressed Ctrl+C while waiting.
+    """
+    loop = asyncio.get_running_loop()
+    future: asyncio.Future[str] = loop.create_future()
+
+    def _resolve(result: str | None, error: BaseException | None) -> None:
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _read() -> None:
+        result, error = None, None
+        try:
+            result = console.input(prompt)
+        except BaseException as e:
+            error = e
+
+        try:
+            loop.call_soon_threadsafe(_resolve, result, error)
+        except RuntimeError:
+            # The loop is already closed, nobody is waiting for the input anymore
+            pass
+
+    threading.Thread(target=_read, name="console-input", daemon=True).start()
+    try:
+        return await future
+    except asyncio.CancelledError:
+        # asyncio.run delivers Ctrl+C as cancellation of the main task
+        raise KeyboardInterrupt()
@@ -1,7 +1,20 @@
 from abc import ABC, abstractmethod
 from .models import GenericMsg
-from typing import Union, Optional
+from typing import Callable, Union, Optional
 from mcp import types
+import asyncio
+
+
+class ContextLengthExceededError(Exception):
+    """The request does not fit into the context window of the model, the history has to be shortened."""
+
+
+def is_context_length_error(e: Exception) -> bool:
+    # OpenAI compatible APIs report the code, some servers (e.g. vLLM, ollama) only the message
+    if getattr(e, "code", None) == "context_length_exceeded":
+        return True
+    message = str(e).lower()
+    return "maximum context length" in message or "context length exceeded" in message or "context window" in message
 
 
 class Provider(ABC):
@@ -11,13 +24,85 @@ class Provider(ABC):
     def __init__(self, model: str):
         self.model = model
         self.__client = None
+        self._sync_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Converted tools by name, along with the tool they were converted from
+        self._tool_payload_cache: dict[str, tuple[types.Tool, dict]] = {}
+        # Payload of the whole tool list and the tools version it was built for
+        self._tool_payloads: tuple[Optional[int], list[dict]] = (None, [])
 
     @classmethod
     def name(cls):
         return cls._name
 
+    def convert_tool(self, tool: types.Tool) -> dict:
+        """Convert a MCP tool to the tool format of the LLM API, the OpenAI function format by default."""
+        return {
+            "type": "function",
+            "function": {
+                "name": tool.name,
+                "description": tool.description,
+                "parameters": tool.inputSchema,
+            }
+        }
+
+    def tool_payloads(self, tools: Optional[list[types.Tool]], tools_version: Optional[int] = None) -> list[dict]:
+        """The converted `tools`, every tool is converted once and reused across requests.
+
+        When `tools_version` is given and unchanged since the last call, the previous list is returned as is.
+        """
+        if tools_version is not None and self._tool_payloads[0] == tools_version:
+            return self._tool_payloads[1]
+
+        payloads = []
+        cache: dict[str, tuple[types.Tool, dict]] = {}
+        for tool in tools or []:
+            cached = self._tool_payload_cache.get(tool.name)
+            if cached is None or cached[0] is not tool:
+                cached = (tool, self.convert_tool(tool))
+            cache[tool.name] = cached
+            payloads.append(cached[1])
+
+        if tools_version is not None:
+            # A new version of the tools, forget the ones which are gone
+            self._tool_payload_cache = cache
+            self._tool_payloads = (tools_version, payloads)
+        else:
+            self._tool_payload_cache.update(cache)
+        return payloads
+
     # Have to handle the differentiation for LLMs
     @abstractmethod
-    def completions_create(self, prompt: str, messages: list[GenericMsg], tools: Optional[list[types.Tool]] = None, max_tokens: int = None) -> Union[GenericMsg, None]:
+    async def acompletions_create(self, prompt: str, messages: list[GenericMsg], tools: Optional[list[types.Tool]] = None, max_tokens: int = None, on_delta: Optional[Callable[[str], None]] = None, tools_version: Optional[int] = None) -> Union[GenericMsg, None]:
+        """Create a completion, when `on_delta` is given the response is streamed and every text delta is passed to it.
+
+        `tools_version` identifies the content of `tools`, e.g. the version of the tool registry, which allows
+        to reuse the converted tools of the previous request.
+
+        Raises:
+            ContextLengthExceededError: If the messages don't fit into the context window of the model.
+        """
         ...
 
+    def completions_create(self, prompt: str, messages: list[GenericMsg], tools: Optional[list[types.Tool]] = None, max_tokens: int = None, on_delta: Optional[Callable[[str], None]] = None, tools_version: Optional[int] = None) -> Union[GenericMsg, None]:
+        """Blocking shim around `acompletions_create` for callers outside of an event loop.
+
+        The async clients pool their connections per event loop, so all calls made through
+        this shim share one private loop instead of creating a new one each time.
+
+        Raises:
+            RuntimeError: If called from a running event loop, use `acompletions_create` there.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError(
+                f"{type(self).__name__}.completions_create() can not be called from a running event loop, await acompletions_create() instead")
+
+        if self._sync_loop is None or self._sync_loop.is_closed():
+            self._sync_loop = asyncio.new_event_loop()
+
+        return self._sync_loop.run_until_complete(
+            self.acompletions_create(prompt=prompt, messages=messages, tools=tools, max_tokens=max_tokens, on_delta=on_delta, tools_version=tools_version)
+        )
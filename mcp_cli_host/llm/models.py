@@ -1,7 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, PrivateAttr
 from enum import Enum
-from typing import Union, Any, Optional
-from abc import ABC
+from typing import Any, Optional
 import json
 from mcp import types
 
@@ -26,35 +25,64 @@ class CallToolResultWithID(BaseModel):
     content: list[types.ContentBlock]
     isError: bool = False
 
-class GenericMsg(BaseModel, ABC):
-    # json str, a whole message responsed by llm
-    message_content: Union[str, list[CallToolResultWithID]]
+class GenericMsg(BaseModel):
+    """A message of the conversation, parsed once when it is created.
+
+    The fields hold the message as it is used by the host, the conversion to the format of a LLM API
+    only happens in the providers, `to_json` gives the OpenAI compatible form.
+    """
+    role: str
+    # str, or a list of content parts
+    content: Optional[Any] = None
+    tool_calls: list[ToolCall] = Field(default_factory=list)
+    # Results of the tool calls, only in a message with role=tool
+    tool_results: list[CallToolResultWithID] = Field(default_factory=list)
     token_usage: Optional[Any] = None
+    # Converted forms of the message by converter, see `MessageConverter`
+    _converted: dict[str, list[dict[str, Any]]] = PrivateAttr(default_factory=dict)
+    # Estimated tokens, see `TokenCounter`
+    _tokens: Optional[int] = PrivateAttr(default=None)
 
-    @property
-    def content(self) -> str:
-        return self.message_content
-    
     @property
     def toolcalls(self) -> list[ToolCall]:
-        pass
+        return self.tool_calls
 
     @property
     def usage(self) -> list[int]:
-        pass
-    
-    def to_json(self):
-        return json.loads(self.message_content)
+        return [self.token_usage.prompt_tokens, self.token_usage.completion_tokens] if self.token_usage else None
+
+    def tool_call_to_json(self, tool_call: ToolCall) -> dict[str, Any]:
+        return {
+            "id": tool_call.id,
+            "type": "function",
+            "function": {
+                "name": tool_call.name,
+                "arguments": json.dumps(tool_call.arguments),
+            }
+        }
+
+    def to_json(self) -> dict[str, Any]:
+        message = {
+            "role": self.role,
+            "content": self.content,
+        }
+        if self.tool_calls:
+            message["tool_calls"] = [self.tool_call_to_json(tool_call) for tool_call in self.tool_calls]
+        return message
+
+    def changed(self) -> None:
+        """Drop what is cached about the message, after it was modified in place."""
+        self._converted.clear()
+        self._tokens = None
 
     def is_tool_res(self):
-        return not isinstance(self.message_content, str)
+        return self.role == Role.TOOL.value
     
     def is_tool_res_image(self):
-        return not isinstance(self.message_content, str) and self.message_content and self.message_content[-1].content and isinstance(self.message_content[-1].content[-1], types.ImageContent)
+        return self.is_tool_res() and self.tool_results and self.tool_results[-1].content and isinstance(self.tool_results[-1].content[-1], types.ImageContent)
     
     def is_tool_res_audio(self):
-        return not isinstance(self.message_content, str) and self.message_content and self.message_content[-1].content and isinstance(self.message_content[-1].content[-1], types.AudioContent)
-
+        return self.is_tool_res() and self.tool_results and self.tool_results[-1].content and isinstance(self.tool_results[-1].content[-1], types.AudioContent)
 
 
 
@@ -1,26 +1,28 @@
 from mcp_cli_host.llm.models import GenericMsg, ToolCall
-from typing import Union
-import json
+from typing import Any
+from ollama import Message
 
 class ollamaMsg(GenericMsg):
-    @property
-    def content(self) -> Union[str, None]:
-        msg_obj = json.loads(self.message_content)
-        return msg_obj["content"]
-    
-    @property
-    def toolcalls(self) -> list[ToolCall]:
-        msg_obj = json.loads(self.message_content)
+    @classmethod
+    def from_message(cls, message: Message, token_usage: Any = None) -> "ollamaMsg":
         tool_calls: list[ToolCall] = []
 
-        for call in msg_obj.get("tool_calls", []) or []:
-            call_obj = ToolCall(name=call["function"]["name"],
-                                arguments=call["function"]["arguments"])
+        for call in message.tool_calls or []:
+            call_obj = ToolCall(name=call.function.name,
+                                arguments=dict(call.function.arguments))
             
             tool_calls.append(call_obj)
 
-        return tool_calls
+        return cls(role=message.role or "assistant",
+                   content=message.content,
+                   tool_calls=tool_calls,
+                   token_usage=token_usage)
 
-    @property  
-    def usage(self) -> list[int]:
-        return [self.token_usage.prompt_tokens, self.token_usage.completion_tokens] if self.token_usage else None
+    def tool_call_to_json(self, tool_call: ToolCall) -> dict[str, Any]:
+        # ollama takes the arguments as object and has no tool call id
+        return {
+            "function": {
+                "name": tool_call.name,
+                "arguments": tool_call.arguments,
+            }
+        }
@@ -1,77 +1,59 @@
-from mcp_cli_host.llm.base_provider import Provider
-from mcp_cli_host.llm.models import GenericMsg, Role, TextContent
+from mcp_cli_host.llm.base_provider import Provider, ContextLengthExceededError, is_context_length_error
+from mcp_cli_host.llm.openai_compat import MessageConverter, join_text_content
+from mcp_cli_host.llm.models import GenericMsg
 from mcp_cli_host.llm.ollama.models import ollamaMsg
 from openai import RateLimitError
-from typing import Optional, Union
-import json
+from typing import Callable, Optional, Union
 import logging
 from mcp import types
-from ollama import Client
+from ollama import AsyncClient, Message
 
 
 
 log = logging.getLogger("mcp_cli_host")
 
-def handle_content_ollama(contents: list[TextContent]) -> str:
-    res = ""
-    for content in contents:
-        res += content.text + "\n"
-
-    return res
-
 class Ollama(Provider):
     _name = "ollama"
 
     def __init__(self, model: str):
         super(Ollama, self).__init__(model)
+        self.converter = MessageConverter(self._name, tool_content=join_text_content)
 
         # Support 'host', 'header' .etc to handle the remote ollama server TODO
-        self.client = Client()
+        self.client = AsyncClient()
 
-    def completions_create(self, prompt: str, messages: list[GenericMsg], tools: Optional[list[types.Tool]] = None, max_tokens: int = None) -> Union[GenericMsg, None]:
-        opeanpi_tools = []
-        for tool in tools:
-            openai_tool = {
-                "type": "function",
-                "function": {
-                    "name": tool.name,
-                    "description": tool.description,
-                    "parameters": tool.inputSchema,
-                }
-            }
-            opeanpi_tools.append(openai_tool)
+    async def acompletions_create(self, prompt: str, messages: list[GenericMsg], tools: Optional[list[types.Tool]] = None, max_tokens: int = None, on_delta: Optional[Callable[[str], None]] = None, tools_version: Optional[int] = None) -> Union[GenericMsg, None]:
+        opeanpi_tools = self.tool_payloads(tools, tools_version)
 
-        openai_msgs = []
-        for msg in messages:
-            # have no idea how message looks like with role=tool, follow the discussion below:
-            # https://learn.microsoft.com/en-us/answers/questions/1726523/missing-parameter-tool-call-id-messages-with-role
-            if msg.is_tool_res():
-                for res in msg.message_content:
-                    openai_msgs.append(
-                        {
-                            "role": Role.TOOL.value,
-                            "name": res.name,
-                            "content": handle_content_ollama(res.content),
-                            "tool_call_id": res.tool_call_id
-                        }
-                    )
-            else:
-                openai_msgs.append(msg.to_json())
+        openai_msgs = self.converter.convert(messages)
 
+        completion = None
         try:
-            completion = self.client.chat(
+            completion = await self.client.chat(
                 model=self.model,
                 messages=openai_msgs,
-                tools=opeanpi_tools
+                tools=opeanpi_tools,
+                stream=on_delta is not None,
             )
 
+            if on_delta is not None:
+                content_parts: list[str] = []
+                tool_calls: list[Message.ToolCall] = []
+                async for chunk in completion:
+                    if chunk.message.content:
+                        content_parts.append(chunk.message.content)
+                        on_delta(chunk.message.content)
+                    if chunk.message.tool_calls:
+                        tool_calls.extend(chunk.message.tool_calls)
+
+                message = Message(role="assistant", content="".join(content_parts), tool_calls=tool_calls or None)
+                return ollamaMsg.from_message(message, token_usage=None)
+
         except RateLimitError as e:
             log.warning(f"OpenAI API request exceeded rate limit, please try later: {e}")
         except Exception as e:
-            if "maximum context length" in str(e):
-                log.warning(f"llm hit its maximum context length: {e}")
-            else:
-                raise e
+            if is_context_length_error(e):
+                raise ContextLengthExceededError(f"llm hit its maximum context length: {e}") from e
+            raise e
 
-        return ollamaMsg(message_content=json.dumps(completion.message.model_dump()),
-                        token_usage=None) if completion else None
+        return ollamaMsg.from_message(completion.message, token_usage=None) if completion else None
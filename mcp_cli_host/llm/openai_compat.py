@@ -0,0 +1,94 @@
+from mcp_cli_host.llm.models import GenericMsg, Role
+from openai import DefaultAsyncHttpxClient
+from typing import Any, Callable, Optional
+from mcp import types
+import httpx
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def join_text_content(contents: list[types.ContentBlock]) -> str:
+    """Tool result content as one string, for APIs which don't take a list of content parts in tool messages."""
+    res = ""
+    for content in contents:
+        res += content.text + "\n"
+
+    return res
+
+
+class MessageConverter:
+    """Converts conversation messages to the `messages` of an OpenAI compatible chat completion request.
+
+    History is append-only between prunes, so the converted form of every message is memoized on the message
+    itself and each request only converts the messages which were added since the previous one.
+
+    Args:
+        key: identifies the conversion, messages hold one memoized form per key.
+        tool_content: converts the content of a tool result, passed through as is by default.
+    """
+
+    def __init__(self, key: str, tool_content: Optional[Callable[[list[types.ContentBlock]], Any]] = None) -> None:
+        self.key = key
+        self.tool_content = tool_content
+
+    def convert(self, messages: list[GenericMsg]) -> list[dict[str, Any]]:
+        converted_msgs: list[dict[str, Any]] = []
+        for msg in messages:
+            converted = msg._converted.get(self.key)
+            if converted is None:
+                converted = self._convert(msg)
+                msg._converted[self.key] = converted
+            converted_msgs.extend(converted)
+
+        return converted_msgs
+
+    def _convert(self, msg: GenericMsg) -> list[dict[str, Any]]:
+        if not msg.is_tool_res():
+            return [msg.to_json()]
+
+        # have no idea how message looks like with role=tool, follow the discussion below:
+        # https://learn.microsoft.com/en-us/answers/questions/1726523/missing-parameter-tool-call-id-messages-with-role
+        # some APIs need the content as string:
+        # https://github.com/cline/cline/issues/230
+        return [
+            {
+                "role": Role.TOOL.value,
+                "name": res.name,
+                "content": self.tool_content(res.content) if self.tool_content else res.content,
+                "tool_call_id": res.tool_call_id
+            }
+            for res in msg.tool_results
+        ]
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode JSON with orjson when it is installed, the standard library otherwise."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            # e.g. non str dict keys or integers beyond 64 bit, which the standard library handles
+            pass
+
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+
+class _JSONBodyAsyncClient(DefaultAsyncHttpxClient):
+    """The default http client of the openai SDK, encoding JSON request bodies with `dumps`."""
+
+    def build_request(self, *args: Any, json: Any = None, **kwargs: Any) -> httpx.Request:
+        if json is not None:
+            kwargs["content"] = dumps(json)
+            headers = httpx.Headers(kwargs.get("headers"))
+            headers.setdefault("Content-Type", "application/json")
+            kwargs["headers"] = headers
+        return super().build_request(*args, **kwargs)
+
+
+def json_http_client() -> Optional[httpx.AsyncClient]:
+    """Http client for the openai SDK which encodes request bodies with orjson, None if orjson is not installed."""
+    return _JSONBodyAsyncClient() if orjson is not None else None
@@ -0,0 +1,60 @@
+from typing import Any, AsyncIterator, Callable, Optional
+from openai.types.chat import ChatCompletionChunk
+
+
+async def collect_openai_stream(
+    stream: AsyncIterator[ChatCompletionChunk],
+    on_delta: Callable[[str], None],
+) -> tuple[dict[str, Any], Optional[Any]]:
+    """Drain an OpenAI compatible chat completion stream.
+
+    Content deltas are forwarded to `on_delta` as they arrive, tool call deltas are
+    merged by their index so the result has the same shape as a non-streamed message.
+
+    Args:
+        stream: chunks returned by `chat.completions.create(stream=True)`.
+        on_delta: callback for every piece of assistant text.
+
+    Returns:
+        The assembled assistant message as dict and the usage reported by the last chunk, if any.
+    """
+    content_parts: list[str] = []
+    tool_calls: dict[int, dict[str, Any]] = {}
+    usage = None
+
+    async for chunk in stream:
+        if chunk.usage:
+            usage = chunk.usage
+        if not chunk.choices:
+            continue
+
+        delta = chunk.choices[0].delta
+        if delta.content:
+            content_parts.append(delta.content)
+            on_delta(delta.content)
+
+        for call in delta.tool_calls or []:
+            index = call.index if call.index is not None else len(tool_calls)
+            merged = tool_calls.setdefault(index, {
+                "id": None,
+                "type": "function",
+                "function": {"name": "", "arguments": ""},
+            })
+            if call.id:
+                merged["id"] = call.id
+            if call.function:
+                if call.function.name:
+                    merged["function"]["name"] += call.function.name
+                if call.function.arguments:
+                    merged["function"]["arguments"] += call.function.arguments
+
+    message: dict[str, Any] = {
+        "role": "assistant",
+        "content": "".join(content_parts) or None,
+    }
+    if tool_calls:
+        for call in tool_calls.values():
+            call["function"]["arguments"] = call["function"]["arguments"] or "{}"
+        message["tool_calls"] = [tool_calls[index] for index in sorted(tool_calls)]
+
+    return message, usage
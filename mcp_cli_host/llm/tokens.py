@@ -0,0 +1,48 @@
+from mcp_cli_host.llm.models import GenericMsg
+from typing import Optional
+import logging
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+log = logging.getLogger("mcp_cli_host")
+
+# Tokens every message costs besides its content, e.g. the role
+MESSAGE_OVERHEAD = 4
+
+
+class TokenCounter:
+    """Estimate the tokens of conversation messages.
+
+    Counts with tiktoken when it is installed, otherwise with the heuristic of about four characters per token,
+    good enough to stay within a budget. The count of a message is computed once and cached on the message.
+    """
+
+    def __init__(self, model: Optional[str] = None) -> None:
+        self.encoding = None
+        if tiktoken is not None:
+            try:
+                try:
+                    self.encoding = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("o200k_base")
+                except KeyError:
+                    # A model tiktoken doesn't know, e.g. of another provider
+                    self.encoding = tiktoken.get_encoding("o200k_base")
+            except Exception as e:
+                # e.g. the encoding can't be downloaded
+                log.debug(f"tiktoken not usable, estimate tokens by length: {e}")
+
+    def count(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return (len(text) + 3) // 4
+
+    def message_tokens(self, msg: GenericMsg) -> int:
+        if msg._tokens is None:
+            text = msg.model_dump_json(include={"content", "tool_calls", "tool_results"}, exclude_none=True)
+            msg._tokens = self.count(text) + MESSAGE_OVERHEAD
+        return msg._tokens
+
+    def total(self, messages: list[GenericMsg]) -> int:
+        return sum(self.message_tokens(msg) for msg in messages)